@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BlogsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blogs'
+
+    def ready(self):
+        # Hook up the cache purges on publish/unpublish
+        from blogs import signals  # noqa: F401
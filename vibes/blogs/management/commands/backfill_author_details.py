@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blogs.models import AuthorLanguage, AuthorLocation, AuthorPage
+from blogs.utils.authors import backfill_author_details
+
+
+class Command(BaseCommand):
+    help = "Fill in the normalized languages and location of existing AuthorPages from their free-text fields"
+
+    def handle(self, *args, **options):
+        authors, languages, locations = backfill_author_details(AuthorPage, AuthorLanguage, AuthorLocation)
+        self.stdout.write(self.style.SUCCESS(
+            "Backfilled %s authors: %s languages, %s locations" % (authors, languages, locations)
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blogs.models import BlogPage
+from blogs.utils.text import backfill_text_stats
+
+
+class Command(BaseCommand):
+    help = "Fill in the stored excerpt, word count and reading time of existing BlogPages, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help="Posts per read and UPDATE")
+        parser.add_argument('--all', action='store_true', help="Recompute posts that already have an excerpt too")
+
+    def handle(self, *args, **options):
+        posts = backfill_text_stats(
+            BlogPage, chunk_size=options['chunk_size'], recompute=options['all'], log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS("Backfilled %s posts" % posts))
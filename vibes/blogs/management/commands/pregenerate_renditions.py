@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from wagtail.images import get_image_model
+
+from blogs.utils.renditions import generate_renditions
+
+
+class Command(BaseCommand):
+    help = "Generate the declared width/format variants (BLOG_RENDITION_*) of every image that lacks some"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parallel', type=int, default=1, help="Images resized at once, each thread with its own db connection")
+
+    def handle(self, *args, **options):
+        image_ids = list(get_image_model().objects.order_by('pk').values_list('pk', flat=True))
+        parallel = options['parallel']
+
+        def run(image_id):
+            try:
+                return generate_renditions(image_id)
+            finally:
+                if parallel > 1:
+                    connection.close()
+
+        if parallel > 1:
+            with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='renditions') as executor:
+                renditions = sum(executor.map(run, image_ids))
+        else:
+            renditions = sum(map(run, image_ids))
+
+        self.stdout.write(self.style.SUCCESS("%s images, %s renditions" % (len(image_ids), renditions)))
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def populate_slugs(apps, schema_editor):
+    BlogCategory = apps.get_model('blogs', 'BlogCategory')
+
+    taken = set()
+    for category in BlogCategory.objects.order_by('pk'):
+        base = slugify(category.name, allow_unicode=True) or 'category'
+        slug = base
+        n = 1
+        while slug in taken:
+            n += 1
+            slug = '%s-%s' % (base, n)
+        taken.add(slug)
+        category.slug = slug
+        category.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0002_upcomingeventpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogcategory',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(populate_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='blogcategory',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, blank=True, max_length=255, unique=True),
+        ),
+    ]
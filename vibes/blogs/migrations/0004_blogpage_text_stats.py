@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Stored excerpt / word count / reading time for posts. Existing posts are filled in
+    by 0008, once 0006 has brought the body StreamField into the migration state.
+    """
+
+    dependencies = [
+        ('blogs', '0003_blogcategory_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpage',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='word_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, verbose_name='Reading time (minutes)'),
+        ),
+    ]
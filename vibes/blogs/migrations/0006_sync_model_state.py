@@ -0,0 +1,138 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:59
+
+import blogs.models
+import blogs.utils.conditional
+import blogs.utils.pagecache
+import django.db.models.deletion
+import modelcluster.contrib.taggit
+import modelcluster.fields
+import wagtail.contrib.routable_page.models
+import wagtail.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blogs', '0005_authorlanguage_authorlocation'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        ('wagtailcore', '0094_alter_page_locale'),
+        ('wagtailimages', '0026_delete_uploadedimage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogIndexPage',
+            fields=[
+                ('page_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='wagtailcore.page')),
+                ('intro', wagtail.fields.RichTextField(blank=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=(blogs.utils.conditional.ConditionalPageMixin, blogs.utils.pagecache.CachedPageMixin, blogs.models.CategoryListingMixin, wagtail.contrib.routable_page.models.RoutablePageMixin, 'wagtailcore.page'),
+        ),
+        migrations.CreateModel(
+            name='BlogTagIndexPage',
+            fields=[
+                ('page_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='wagtailcore.page')),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=(blogs.utils.conditional.ConditionalPageMixin, blogs.utils.pagecache.CachedPageMixin, wagtail.contrib.routable_page.models.RoutablePageMixin, 'wagtailcore.page'),
+        ),
+        migrations.AlterModelOptions(
+            name='blogcategory',
+            options={'verbose_name_plural': 'blog categories'},
+        ),
+        migrations.AlterModelOptions(
+            name='blogpage',
+            options={},
+        ),
+        migrations.RemoveField(
+            model_name='blogpage',
+            name='content',
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='allow_comments',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='blog_posts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='body',
+            field=wagtail.fields.StreamField([('heading', 0), ('paragraph', 1), ('image', 6), ('video', 8)], block_lookup={0: ('wagtail.blocks.CharBlock', (), {'form_classname': 'full title'}), 1: ('wagtail.blocks.RichTextBlock', (), {}), 2: ('wagtail.images.blocks.ImageChooserBlock', (), {'label': 'Image'}), 3: ('wagtail.blocks.CharBlock', (), {'label': 'Caption', 'required': False}), 4: ('wagtail.blocks.ChoiceBlock', [], {'choices': [('right', 'Right'), ('left', 'Left'), ('center', 'Center')], 'label': 'Float', 'required': False}), 5: ('wagtail.blocks.ChoiceBlock', [], {'choices': [('small', 'Small'), ('medium', 'Medium'), ('large', 'Large')], 'label': 'Size', 'required': False}), 6: ('wagtail.blocks.StructBlock', [[('image', 2), ('caption', 3), ('float', 4), ('size', 5)]], {}), 7: ('wagtail.embeds.blocks.EmbedBlock', (), {'label': 'Video'}), 8: ('wagtail.blocks.StructBlock', [[('video', 7), ('caption', 3), ('float', 4), ('size', 5)]], {})}, default=[]),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wagtailimages.image', verbose_name='Image'),
+        ),
+        migrations.AlterField(
+            model_name='blogcategory',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='blogpage',
+            name='featured',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='AuthorPage',
+            fields=[
+                ('page_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='wagtailcore.page')),
+                ('bio', wagtail.fields.StreamField([('heading', 0), ('paragraph', 1), ('image', 6), ('video', 8)], block_lookup={0: ('wagtail.blocks.CharBlock', (), {'form_classname': 'full title'}), 1: ('wagtail.blocks.RichTextBlock', (), {}), 2: ('wagtail.images.blocks.ImageChooserBlock', (), {'label': 'Image'}), 3: ('wagtail.blocks.CharBlock', (), {'label': 'Caption', 'required': False}), 4: ('wagtail.blocks.ChoiceBlock', [], {'choices': [('right', 'Right'), ('left', 'Left'), ('center', 'Center')], 'label': 'Float', 'required': False}), 5: ('wagtail.blocks.ChoiceBlock', [], {'choices': [('small', 'Small'), ('medium', 'Medium'), ('large', 'Large')], 'label': 'Size', 'required': False}), 6: ('wagtail.blocks.StructBlock', [[('image', 2), ('caption', 3), ('float', 4), ('size', 5)]], {}), 7: ('wagtail.embeds.blocks.EmbedBlock', (), {'label': 'Video'}), 8: ('wagtail.blocks.StructBlock', [[('video', 7), ('caption', 3), ('float', 4), ('size', 5)]], {})})),
+                ('location', models.CharField(blank=True, help_text="Author's location (e.g., Colorado, USA)", max_length=255, null=True)),
+                ('languages', models.CharField(blank=True, help_text='Comma-separated list of languages (e.g., English, Spanish)', max_length=255, null=True)),
+                ('profile_picture', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wagtailimages.image')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='author_page', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+            bases=(blogs.utils.conditional.ConditionalPageMixin, 'wagtailcore.page'),
+        ),
+        migrations.CreateModel(
+            name='BlogPageGalleryImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sort_order', models.IntegerField(blank=True, editable=False, null=True)),
+                ('caption', models.CharField(blank=True, max_length=250)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailimages.image')),
+                ('page', modelcluster.fields.ParentalKey(on_delete=django.db.models.deletion.CASCADE, related_name='gallery_images', to='blogs.blogpage')),
+            ],
+            options={
+                'ordering': ['sort_order'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogPageTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_object', modelcluster.fields.ParentalKey(on_delete=django.db.models.deletion.CASCADE, related_name='tagged_items', to='blogs.blogpage')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(app_label)s_%(class)s_items', to='taggit.tag')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='blogpage',
+            name='tags',
+            field=modelcluster.contrib.taggit.ClusterTaggableManager(blank=True, help_text='A comma-separated list of tags.', through='blogs.BlogPageTag', to='taggit.Tag', verbose_name='Tags'),
+        ),
+        migrations.DeleteModel(
+            name='UpcomingEventPage',
+        ),
+    ]
@@ -0,0 +1,35 @@
+import django.db.models.deletion
+import modelcluster.fields
+from django.db import migrations, models
+
+from blogs.utils.authors import backfill_author_details
+
+
+def backfill(apps, schema_editor):
+    backfill_author_details(
+        apps.get_model('blogs', 'AuthorPage'),
+        apps.get_model('blogs', 'AuthorLanguage'),
+        apps.get_model('blogs', 'AuthorLocation'),
+    )
+
+
+class Migration(migrations.Migration):
+    """Normalized author languages / location, filled in from the existing free text"""
+
+    dependencies = [
+        ('blogs', '0006_sync_model_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorpage',
+            name='author_languages',
+            field=modelcluster.fields.ParentalManyToManyField(blank=True, editable=False, related_name='authors', to='blogs.authorlanguage'),
+        ),
+        migrations.AddField(
+            model_name='authorpage',
+            name='author_location',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='authors', to='blogs.authorlocation'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
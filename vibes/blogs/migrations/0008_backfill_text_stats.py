@@ -0,0 +1,19 @@
+from django.db import migrations
+
+from blogs.utils.text import backfill_text_stats
+
+
+def backfill(apps, schema_editor):
+    backfill_text_stats(apps.get_model('blogs', 'BlogPage'))
+
+
+class Migration(migrations.Migration):
+    """Text stats of the posts that existed before 0004, now that body is in the migration state"""
+
+    dependencies = [
+        ('blogs', '0007_author_details'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
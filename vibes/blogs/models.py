@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.db import models
 from django import forms
 from django.contrib.auth import get_user_model
+from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 from modelcluster.contrib.taggit import ClusterTaggableManager
@@ -9,7 +11,8 @@ from modelcluster.fields import ParentalKey, ParentalManyToManyField
 from taggit.models import TaggedItemBase
 
 # Add these:
-from wagtail.models import Page, Orderable
+from wagtail.models import Page, Orderable, PageManager
+from wagtail.query import PageQuerySet
 from wagtail.fields import RichTextField, StreamField
 from wagtail import blocks
 from wagtail.snippets.models import register_snippet
@@ -23,15 +26,50 @@ from wagtail.admin.panels import (
 )
 
 from blogs.utils.paginate import paginate_item
+from blogs.utils.pagecache import CachedPageMixin
+from blogs.utils.conditional import ConditionalPageMixin, newest, queryset_freshness
+from blogs.utils.authors import author_bio, author_posts, language_terms, location_terms, recent_post_cards, term_rows
+from blogs.utils.categories import all_categories, category_listing
+from blogs.utils.choosers import prime_streams
+from blogs.utils.tags import tag_cloud, tag_listing
+from blogs.utils.text import text_stats
 from blogs.blocks import InlineImageBlock, InlineVideoBlock
 
-from custom_comments import get_model, get_form
+from custom_comments import get_form, get_comment_thread
 
 
 User = get_user_model()  # Gets the currently active User model
 
 
-class BlogIndexPage(RoutablePageMixin, Page):
+class CategoryListingMixin(object):
+    """
+    The /category/<slug>/ route, shared by the blog index, the posts and the home page.
+    Must come before RoutablePageMixin in the bases.
+    """
+
+    # reference:
+    # https://docs.wagtail.io/en/v2.13.2/reference/contrib/routablepage.html#module-wagtail.contrib.routable_page
+    @route(r"^category/(?P<cat_slug>[-\w]*)/$", name="category_view")
+    def category_view(self, request, cat_slug):
+        """Find blog posts based on a category."""
+
+        # 404s straight away (and cheaply, it's cached) if the category doesn't exist
+        category, blog_pages = category_listing(request, cat_slug, 10)
+
+        # Note: The below template (latest_posts.html) will need to be adjusted
+        return self.render(
+            request,
+            context_overrides={
+                'title': category.name,
+                'category': category,
+                'posts': blog_pages,
+                'categories' : all_categories()
+            },
+            template="blog/blog_cat_index_page.html",
+        )
+
+
+class BlogIndexPage(CachedPageMixin, ConditionalPageMixin, CategoryListingMixin, RoutablePageMixin, Page):
     intro = RichTextField(blank=True)
 
     # Specifies that only ArticlePage objects can live under this index page
@@ -42,82 +80,58 @@ class BlogIndexPage(RoutablePageMixin, Page):
         FieldPanel('intro', classname="full")
     ]
 
+    def get_validators(self, request):
+        # The listing changes whenever a post under it is (re)published or goes away
+        newest_post, post_count = queryset_freshness(BlogPage.objects.child_of(self).live())
+        return newest(self.last_published_at, newest_post), (post_count,)
+
     def get_context(self, request):
         # Check if the 'featured' query parameter is present
         is_featured = request.GET.get('featured', 'false').lower() == 'true'
 
         # Update context to include only published posts, ordered by reverse-chron
+        # Posts come back as BlogPage with everything the cards need already fetched
         context = super().get_context(request)
-        all_posts = self.get_children().live().order_by('-first_published_at')
+        all_posts = BlogPage.objects.child_of(self).live().for_listing().order_by('-first_published_at')
 
 
         # Filter only featured blog posts if 'featured=true' is in the URL
         if is_featured:
-            # Get all child pages and filter those that are instances of BlogPage
-            b_posts = self.get_children().live().type(BlogPage).order_by('-first_published_at')
-
             # Filter the posts by the 'featured' field in BlogPage
-            all_posts = b_posts.filter(blogpage__featured=True)
+            all_posts = all_posts.filter(featured=True)
             context['is_featured'] = is_featured
 
-        posts = paginate_item(request, all_posts, 10)
+        posts = paginate_item(
+            request, all_posts, 10, keyset=True,
+            count_signature={'parent': self.pk, 'featured': is_featured},
+        )
 
-        categories = BlogCategory.objects.all()
+        categories = all_categories()
         context['blogpages'] = posts
         context['categories'] = categories
 
         return context
 
-    # reference:
-    # https://docs.wagtail.io/en/v2.13.2/reference/contrib/routablepage.html#module-wagtail.contrib.routable_page
-    @route(r"^category/(?P<cat_slug>[-\w]*)/$", name="category_view")
-    def category_view(self, request, cat_slug):
-        """Find blog posts based on a category."""
-
-        try:
-            # Look for the blog category by its slug.
-            category = BlogCategory.objects.get(name=cat_slug)
-        except Exception:
-            # Blog category doesnt exist (ie /blog/category/missing-category/)
-            # Redirect to self.url, return a 404.. that's up to you!
-            category = None
-
-        if category is None:
-            # This is an additional check.
-            # If the category is None, do something. Maybe default to a particular category.
-            # Or redirect the user to /blog/ ¯\_(ツ)_/¯
-            pass
-
-        posts = BlogPage.objects.live().public().filter(categories__in=[category])
-        blog_pages = paginate_item(request, posts, 10)
-
-
-        # Note: The below template (latest_posts.html) will need to be adjusted
-        return self.render(
-            request,
-            context_overrides={
-                'title': cat_slug,
-                'posts': blog_pages,
-                'categories' : BlogCategory.objects.all()
-            },
-            template="blog/blog_cat_index_page.html",
-        )
 
+class BlogTagIndexPage(CachedPageMixin, ConditionalPageMixin, RoutablePageMixin, Page):
 
-class BlogTagIndexPage(RoutablePageMixin, Page):
+    def get_validators(self, request):
+        # Any post can carry the tag, the tag itself is part of the url
+        newest_post, post_count = queryset_freshness(BlogPage.objects.live())
+        return newest(self.last_published_at, newest_post), (post_count,)
 
     def get_context(self, request):
 
-        # Filter by tag
-        tag = request.GET.get('tag')
-        blogpages = BlogPage.objects.filter(tags__name=tag)
-
-        posts = paginate_item(request, blogpages, 9)
+        # Filter by ?tag= (repeatable, with ?match=any for either tag), from the tag index
+        tags, match, posts = tag_listing(request, 9)
 
         # Update template context
         context = super().get_context(request)
         context['blogpages'] = posts
-        context['tag'] = tag
+        context['tags'] = [{'slug': slug, 'name': name} for tag_id, slug, name in tags]
+        context['tag'] = ', '.join(name for tag_id, slug, name in tags)
+        context['match'] = match
+        context['tag_cloud'] = tag_cloud()
         return context
 
 
@@ -128,8 +142,28 @@ class BlogPageTag(TaggedItemBase):
         on_delete=models.CASCADE
     )
 
+
+class BlogPageQuerySet(PageQuerySet):
+    def for_listing(self):
+        """
+        Shape posts for listing cards: the image, author and comment counters come in
+        the same query, tags, categories and image renditions in one query each, however
+        many cards there are. The body StreamField is left behind.
+        """
+        return (
+            self.select_related('image', 'author', 'comment_stats')
+            .prefetch_related('tags', 'categories', 'image__renditions')
+            .defer('body')
+        )
+
+
+BlogPageManager = PageManager.from_queryset(BlogPageQuerySet)
+
+
 # Individual blog
-class BlogPage(RoutablePageMixin, Page):
+class BlogPage(CachedPageMixin, ConditionalPageMixin, CategoryListingMixin, RoutablePageMixin, Page):
+    objects = BlogPageManager()
+
     def get_absolute_url(self):
         return self.get_url()
 
@@ -141,30 +175,54 @@ class BlogPage(RoutablePageMixin, Page):
             return None
 
     def get_streamfield_text(self):
-        for block in self.body:
-            if block.block_type == "paragraph":
-                return block
+        """The card excerpt, stored at publish (older posts get it from backfill_text_stats)"""
+        return self.excerpt
+
+    def set_text_stats(self):
+        self.excerpt, self.word_count, self.reading_time = text_stats(self.body)
+
+    def save(self, *args, **kwargs):
+        # Publishing writes the body, drafts only touch revision bookkeeping
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'body' in update_fields:
+            self.set_text_stats()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'excerpt', 'word_count', 'reading_time'}
+        return super().save(*args, **kwargs)
 
     def get_categories(self):
-        categories = BlogCategory.objects.all()
+        categories = all_categories()
         return categories
 
 
+    def comment_count(self):
+        """Public comments on the post, from the denormalized counters"""
+        stats = getattr(self, 'comment_stats', None)
+        return stats.comment_count if stats else 0
+
+    def last_comment_at(self):
+        stats = getattr(self, 'comment_stats', None)
+        return stats.last_comment_at if stats else None
+
+    def get_validators(self, request):
+        # New or moderated comments change the page as much as a publish does
+        return newest(self.last_published_at, self.last_comment_at()), (self.comment_count(),)
+
     def get_context(self, request, *args, **kwargs):
         context = super().get_context(request, *args, **kwargs)
 
+        # Every image in the body (and its renditions) in two queries, before the blocks render
+        prime_streams([self.body])
+
         # Get the dynamic comment form using the `get_form` function from custom_comments
         CommentForm = get_form()
         context['comment_form'] = CommentForm(self)
 
-        # Fetch any existing comments using the `get_model` function
-        Comment = get_model()
-        # Filter comments that are public and order them by submission date
-        context['comment_list'] = Comment.objects.filter(
-            object_pk=self.pk,
-            is_public=True,
-            is_removed=False
-        ).order_by('submit_date')
+        # First page of the public comments, ordered by submission date.
+        # The rest is loaded on demand from the comment_list JSON view.
+        context['comment_list'] = paginate_item(
+            request, get_comment_thread(self), settings.BLOG_COMMENTS_PER_PAGE
+        )
 
         return context
 
@@ -183,7 +241,7 @@ class BlogPage(RoutablePageMixin, Page):
         related_name='blog_posts'
     )
     tags = ClusterTaggableManager(through=BlogPageTag, blank=True)
-    categories = ParentalManyToManyField('blog.BlogCategory', blank=True)
+    categories = ParentalManyToManyField('blogs.BlogCategory', blank=True)
     body = StreamField([
         ('heading', blocks.CharBlock(form_classname="full title")),
         ('paragraph', blocks.RichTextBlock()),
@@ -191,9 +249,16 @@ class BlogPage(RoutablePageMixin, Page):
         ('video', InlineVideoBlock()),
     ], use_json_field=True)
 
+    # Worked out from the body on save, so listings never have to load it
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    reading_time = models.PositiveSmallIntegerField("Reading time (minutes)", default=0, db_index=True, editable=False)
+
     search_fields = Page.search_fields + [
         index.SearchField('body'),
     ]
+    # Indexed after the request by the queue in search.indexing, and only when the text changed
+    search_auto_update = False
 
     # https://docs.wagtail.io/en/stable/topics/streamfield.html
     content_panels = Page.content_panels + [
@@ -214,40 +279,6 @@ class BlogPage(RoutablePageMixin, Page):
         InlinePanel('gallery_images', label="Gallery images"),
     ]
 
-    # reference:
-    # https://docs.wagtail.io/en/v2.13.2/reference/contrib/routablepage.html#module-wagtail.contrib.routable_page
-    @route(r"^category/(?P<cat_slug>[-\w]*)/$", name="category_view")
-    def category_view(self, request, cat_slug):
-        """Find blog posts based on a category."""
-
-        try:
-            # Look for the blog category by its slug.
-            category = BlogCategory.objects.get(name=cat_slug)
-        except Exception:
-            # Blog category doesnt exist (ie /blog/category/missing-category/)
-            # Redirect to self.url, return a 404.. that's up to you!
-            category = None
-
-        if category is None:
-            # This is an additional check.
-            # If the category is None, do something. Maybe default to a particular category.
-            # Or redirect the user to /blog/ ¯\_(ツ)_/¯
-            pass
-
-        posts = BlogPage.objects.live().public().filter(categories__in=[category])
-        blog_pages = paginate_item(request, posts, 10)
-
-        # Note: The below template (latest_posts.html) will need to be adjusted
-        return self.render(
-            request,
-            context_overrides={
-                'title': cat_slug,
-                'posts': blog_pages,
-                'categories' : BlogCategory.objects.all()
-            },
-            template="blog/blog_cat_index_page.html",
-        )
-
 
 @hooks.register('before_create_page')
 def set_default_author(request, parent_page, page):
@@ -271,6 +302,8 @@ class BlogPageGalleryImage(Orderable):
 @register_snippet
 class BlogCategory(models.Model):
     name = models.CharField(max_length=255)
+    # Used in /category/<slug>/ urls, filled in from the name when left blank
+    slug = models.SlugField(max_length=255, unique=True, blank=True, allow_unicode=True)
     icon = models.ForeignKey(
         'wagtailimages.Image', null=True, blank=True,
         on_delete=models.SET_NULL, related_name='+'
@@ -278,17 +311,52 @@ class BlogCategory(models.Model):
 
     panels = [
         FieldPanel('name'),
+        FieldPanel('slug'),
         FieldPanel('icon'),
     ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            base = slugify(self.name, allow_unicode=True) or 'category'
+            self.slug = base
+            n = 1
+            while BlogCategory.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
+                n += 1
+                self.slug = '%s-%s' % (base, n)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name_plural = 'blog categories'
 
 
-class AuthorPage(Page):
+class AuthorLanguage(models.Model):
+    """A language authors write in, one row per slug, filled in from AuthorPage.languages"""
+    name = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, unique=True, allow_unicode=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
+class AuthorLocation(models.Model):
+    """Where authors are, one row per slug, filled in from AuthorPage.location"""
+    name = models.CharField(max_length=255)
+    slug = models.SlugField(max_length=255, unique=True, allow_unicode=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+
+class AuthorPage(ConditionalPageMixin, Page):
     user = models.OneToOneField(
         User,
         on_delete=models.PROTECT,
@@ -311,6 +379,12 @@ class AuthorPage(Page):
     location = models.CharField(max_length=255, null=True, blank=True, help_text="Author's location (e.g., Colorado, USA)")
     languages = models.CharField(max_length=255, null=True, blank=True, help_text="Comma-separated list of languages (e.g., English, Spanish)")
 
+    # The two fields above, normalized on save for the author directory's filters
+    author_languages = ParentalManyToManyField(AuthorLanguage, blank=True, related_name='authors', editable=False)
+    author_location = models.ForeignKey(
+        AuthorLocation, null=True, blank=True, on_delete=models.SET_NULL, related_name='authors', editable=False
+    )
+
     content_panels = Page.content_panels + [
         FieldPanel('user'),
         FieldPanel('bio'),
@@ -321,25 +395,42 @@ class AuthorPage(Page):
         ], heading="Author Details")
     ]
 
+    # Indexed by the queue in search.indexing, like BlogPage
+    search_auto_update = False
+
     def split_languages(self):
         """Return the languages as a list"""
-        if self.languages:
-            return [lang.strip() for lang in self.languages.split(',')]
-        return []
+        return [name for slug, name in language_terms(self.languages)]
+
+    def set_author_details(self):
+        """Point author_languages / author_location at the rows for the free-text fields"""
+        self.author_languages = term_rows(AuthorLanguage, language_terms(self.languages))
+        location = term_rows(AuthorLocation, location_terms(self.location))
+        self.author_location = location[0] if location else None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'languages', 'location'} & set(update_fields):
+            self.set_author_details()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'author_languages', 'author_location'}
+        super().save(*args, **kwargs)
+
+    def get_validators(self, request):
+        # From the materialized recent posts, which are rebuilt on every post publish
+        entry = author_posts(self.user_id)
+        return newest(self.last_published_at, entry['newest']), (entry['count'],)
 
     def get_context(self, request):
         context = super().get_context(request)
 
-        # Filter for only fully published (live and with a published date) blog posts
-        recent_blogs = (
-            self.user.blog_posts.specific()
-            .live()
-            .public()  # Ensures only publicly accessible pages are included
-            .type(BlogPage)
-            .filter(first_published_at__isnull=False)  # Exclude pages without a publish date
-            .order_by('-first_published_at')[:7]  # Order by published date and limit results
-        )
-
-        context['recent_blogs'] = recent_blogs
+        # Live, public, published posts as cards, newest first, materialized on publish
+        context['recent_blogs'] = recent_post_cards(author_posts(self.user_id))
         context['author'] = self.user
+        # Previews show the draft, which the cached bio isn't
+        if getattr(request, 'is_preview', False):
+            prime_streams([self.bio])
+            context['bio_html'] = self.bio.render_as_block()
+        else:
+            context['bio_html'] = author_bio(self)
         return context
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from taggit.models import Tag
+
+from wagtail.images import get_image_model
+from wagtail.signals import page_published, page_unpublished
+
+from blogs.models import AuthorPage, BlogCategory, BlogPage
+from blogs.utils.authors import AUTHOR_POSTS_NAMESPACE, refresh_author_posts
+from blogs.utils.cache import bump_namespace
+from blogs.utils.categories import CATEGORY_NAMESPACE, CATEGORY_POSTS_NAMESPACE, drop_category_snapshot
+from blogs.utils.pagecache import purge_all_pages, purge_page_cache
+from blogs.utils.paginate import COUNT_NAMESPACE
+from blogs.utils.renditions import page_image_ids, queue_renditions
+from blogs.utils.tags import TAG_NAMESPACE
+
+
+@receiver(pre_save, sender=BlogPage)
+def remember_live_categories(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Publishing saves the new categories; the routes of the ones being left need purging too
+    if raw or instance.pk is None or (update_fields is not None and 'categories' not in update_fields):
+        return
+    instance._live_category_slugs = list(
+        BlogCategory.objects.filter(blogpage=instance.pk).values_list('slug', flat=True)
+    )
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def purge_listing_caches(sender, instance, **kwargs):
+    """Any publish or unpublish can change what a listing holds"""
+    bump_namespace(COUNT_NAMESPACE)
+    bump_namespace(CATEGORY_POSTS_NAMESPACE)
+    bump_namespace(TAG_NAMESPACE)
+    purge_page_cache(instance, getattr(instance, '_live_category_slugs', ()))
+
+
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def purge_category_caches(sender, instance, **kwargs):
+    # Fires for snippet edits in the admin as well as fixtures and the shell.
+    # A renamed or deleted category changes which slugs resolve, and to what
+    bump_namespace(CATEGORY_NAMESPACE)
+    bump_namespace(CATEGORY_POSTS_NAMESPACE)
+    drop_category_snapshot()
+    # Every cached page carries the category sidebar
+    purge_all_pages()
+
+
+@receiver(page_published, sender=BlogPage)
+@receiver(page_unpublished, sender=BlogPage)
+def refresh_author_caches(sender, instance, **kwargs):
+    # Every author's list goes (the post may have had another author before this revision);
+    # the post's own author gets theirs rebuilt straight away
+    bump_namespace(AUTHOR_POSTS_NAMESPACE)
+    if instance.author_id:
+        author_id = instance.author_id
+        transaction.on_commit(lambda: refresh_author_posts(author_id))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def purge_tag_caches(sender, instance, **kwargs):
+    # A renamed tag changes its slug and the name on every post card carrying it
+    bump_namespace(TAG_NAMESPACE)
+    purge_all_pages()
+
+
+@receiver(post_save, sender=get_image_model())
+def pregenerate_uploaded_renditions(sender, instance, **kwargs):
+    # Uploads and replaced files; wagtail drops the old renditions before saving.
+    # Fixtures (loaddata) may not come with the files, pregenerate_renditions covers them.
+    if kwargs.get('raw'):
+        return
+    queue_renditions([instance.pk])
+
+
+@receiver(page_published, sender=BlogPage)
+@receiver(page_published, sender=AuthorPage)
+def pregenerate_page_renditions(sender, instance, **kwargs):
+    # Images chosen for the page that were uploaded before the variants were declared
+    queue_renditions(page_image_ids(instance))
+
+
+@receiver(post_save, sender=BlogCategory)
+def pregenerate_icon_renditions(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    queue_renditions([instance.icon_id])
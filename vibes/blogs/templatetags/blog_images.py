@@ -0,0 +1,64 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from blogs.utils.renditions import find_renditions, queue_renditions
+
+
+register = template.Library()
+
+# sizes attributes for the InlineImageBlock sizes; anything else is passed through as is
+SIZES = {
+    'small': '(min-width: 992px) 240px, 50vw',
+    'medium': '(min-width: 992px) 480px, 100vw',
+    'large': '100vw',
+}
+
+
+def srcset(renditions):
+    return ', '.join('%s %dw' % (rendition.url, rendition.width) for rendition in renditions)
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', max_width=None, alt=None, css_class=''):
+    """
+    A <picture> of the pre-generated width variants of an image (blogs.utils.renditions),
+    a <source> per extra format (webp, avif) and an <img> in the original format:
+
+        {% responsive_image page.image sizes=block.value.size alt=page.title %}
+        {% responsive_image category.icon sizes="48px" max_width=320 %}
+
+    Only renditions that already exist are used, so rendering never resizes anything.
+    Until the worker pool has made them the original file is served, and any missing
+    variants are queued.
+    """
+    if not image:
+        return ''
+
+    sizes = SIZES.get(sizes, sizes)
+    alt = image.default_alt_text if alt is None else alt
+    found, missing = find_renditions(image)
+    if missing:
+        queue_renditions([image.pk], inline=False)
+    if max_width:
+        found = {
+            output_format: [rendition for rendition in renditions if rendition.width <= max_width] or renditions[:1]
+            for output_format, renditions in found.items()
+        }
+
+    fallback = found.pop(None)
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((output_format, srcset(renditions), sizes) for output_format, renditions in found.items() if renditions),
+    )
+    if fallback:
+        largest = fallback[-1]
+        img = format_html(
+            '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy">',
+            largest.url, srcset(fallback), sizes, largest.width, largest.height, alt, css_class,
+        )
+    else:
+        img = format_html(
+            '<img src="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy">',
+            image.file.url, image.width, image.height, alt, css_class,
+        )
+    return format_html('<picture>{}{}</picture>', sources, img)
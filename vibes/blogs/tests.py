@@ -1,3 +1,527 @@
-from django.test import TestCase
+import datetime
+import json
+import time
 
-# Create your tests here.
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.models.signals import post_save
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.text import slugify
+
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.images import get_image_model
+from wagtail.contrib.routable_page.models import RoutablePageMixin
+from wagtail.models import Page, Site
+
+from blogs.models import AuthorLanguage, AuthorLocation, AuthorPage, BlogCategory, BlogIndexPage, BlogPage
+from blogs.utils.authors import author_bio, author_posts, backfill_author_details
+from blogs.utils.cache import namespace_version
+from blogs.utils.choosers import prime_streams
+from blogs.utils.pagecache import cached_response, page_cache_key, path_namespace, store_response
+from blogs.utils.paginate import CursorPage, paginate_item
+from blogs.utils import tags as tags_module
+from blogs.utils.tags import MATCH_ANY, resolve_tags, tagged_post_ids
+from blogs.utils.text import backfill_text_stats, text_stats
+
+
+# Image files stay in memory instead of going to the configured S3 bucket
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BlogListingQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(depth=1)
+        self.index = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.category = BlogCategory.objects.create(name="news")
+        self.author = get_user_model().objects.create_user("writer", password="secret")
+
+    def add_posts(self, count):
+        for n in range(count):
+            image = get_image_model().objects.create(title="Image %s" % n, file=get_test_image_file())
+            post = self.index.add_child(instance=BlogPage(
+                title="Post %s" % n,
+                slug="post-%s" % n,
+                date=datetime.date.today(),
+                author=self.author,
+                image=image,
+                body=[('paragraph', '<p>Hello</p>')],
+            ))
+            post.tags.add("tag-%s" % n)
+            post.categories.add(self.category)
+            post.save_revision().publish()
+
+    def render_cards(self):
+        # Touch everything a listing card shows
+        posts = BlogPage.objects.child_of(self.index).live().for_listing()
+        for post in posts:
+            post.image.title
+            post.author.username
+            list(post.tags.all())
+            list(post.categories.all())
+            list(post.image.renditions.all())
+
+    def test_listing_query_count_is_constant(self):
+        self.add_posts(10)
+        # posts (with image and author), tags, categories, renditions
+        with self.assertNumQueries(4):
+            self.render_cards()
+
+
+class TextStatsTests(TestCase):
+    def body(self, *blocks):
+        return BlogPage(body=list(blocks)).body
+
+    def test_excerpt_is_the_first_paragraph_as_text(self):
+        excerpt, words, reading_time = text_stats(self.body(
+            ('heading', 'Intro'),
+            ('paragraph', '<p>Fish &amp; <b>chips</b></p>'),
+            ('paragraph', '<p>Second one</p>'),
+        ))
+        self.assertEqual(excerpt, 'Fish & chips')
+        self.assertEqual(words, 6)
+        self.assertEqual(reading_time, 1)
+
+    @override_settings(BLOG_EXCERPT_WORDS=3, BLOG_WORDS_PER_MINUTE=2)
+    def test_excerpt_is_truncated_and_reading_time_rounds_up(self):
+        excerpt, words, reading_time = text_stats(self.body(('paragraph', '<p>one two three four five</p>')))
+        self.assertEqual(excerpt, 'one two three…')
+        self.assertEqual(words, 5)
+        self.assertEqual(reading_time, 3)
+
+    def test_no_paragraph_means_no_excerpt(self):
+        self.assertEqual(text_stats(self.body(('heading', 'Just a title'))), ('', 3, 1))
+        self.assertEqual(text_stats(self.body()), ('', 0, 0))
+
+    @override_settings(STORAGES=TEST_STORAGES)
+    def test_publishing_stores_the_stats(self):
+        cache.clear()
+        index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        post = index.add_child(instance=BlogPage(
+            title="Post", slug="post", date=datetime.date.today(), body=[('heading', 'Only a heading')],
+        ))
+        post.body = [('paragraph', '<p>Now with words</p>')]
+        post.save_revision().publish()
+
+        post = BlogPage.objects.defer('body').get(pk=post.pk)
+        self.assertEqual(post.get_streamfield_text(), 'Now with words')
+        self.assertEqual((post.word_count, post.reading_time), (3, 1))
+
+    def test_backfill_with_the_migration_state(self):
+        cache.clear()
+        index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        post = index.add_child(instance=BlogPage(
+            title="Post", slug="post", date=datetime.date.today(), body=[('paragraph', '<p>Older post</p>')],
+        ))
+        BlogPage.objects.filter(pk=post.pk).update(excerpt='', word_count=0, reading_time=0)
+
+        state = MigrationLoader(connection).project_state(('blogs', '0008_backfill_text_stats'))
+        self.assertEqual(backfill_text_stats(state.apps.get_model('blogs', 'BlogPage')), 1)
+        post = BlogPage.objects.get(pk=post.pk)
+        self.assertEqual((post.excerpt, post.word_count, post.reading_time), ('Older post', 2, 1))
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class TagIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.a = self.add_post("a", "Django", "Wagtail")
+        self.b = self.add_post("b", "Django")
+        self.c = self.add_post("c", "Wagtail")
+        self.django, self.wagtail = [tag[0] for tag in resolve_tags(["django", "wagtail"])]
+
+    def add_post(self, slug, *tags):
+        post = self.index.add_child(instance=BlogPage(
+            title=slug, slug=slug, date=datetime.date.today(), body=[('paragraph', '<p>Hello</p>')],
+        ))
+        post.tags.add(*tags)
+        post.save_revision().publish()
+        return post
+
+    def test_single_tag_is_its_posting_list(self):
+        self.assertEqual(tagged_post_ids([self.django]), [self.b.pk, self.a.pk])
+
+    def test_all_intersects_and_any_merges_newest_first(self):
+        self.assertEqual(tagged_post_ids([self.django, self.wagtail]), [self.a.pk])
+        self.assertEqual(
+            tagged_post_ids([self.wagtail, self.django], match=MATCH_ANY),
+            [self.c.pk, self.b.pk, self.a.pk],
+        )
+
+    def test_cached_index_answers_without_queries(self):
+        tagged_post_ids([self.django, self.wagtail])
+        with self.assertNumQueries(0):
+            tagged_post_ids([self.django, self.wagtail], match=MATCH_ANY)
+
+    def test_posts_missing_from_the_directory_come_first(self):
+        directory = tags_module.tag_directory()
+        directory = dict(directory, order=[post_id for post_id in directory['order'] if post_id != self.c.pk])
+        with mock.patch.object(tags_module, 'tag_directory', return_value=directory):
+            self.assertEqual(
+                tagged_post_ids([self.django, self.wagtail], match=MATCH_ANY),
+                [self.c.pk, self.b.pk, self.a.pk],
+            )
+
+    def test_names_resolve_and_unknown_tags_drop(self):
+        self.assertEqual(
+            [tag[0] for tag in resolve_tags(["DJANGO ", "nope", "django"])],
+            [self.django],
+        )
+
+    def test_unpublishing_leaves_the_index(self):
+        self.b.unpublish()
+        self.assertEqual(tagged_post_ids([self.django]), [self.a.pk])
+        self.assertEqual(tagged_post_ids([self.django, self.wagtail], match=MATCH_ANY), [self.c.pk, self.a.pk])
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class RenditionSignalTests(TestCase):
+    def test_fixtures_queue_no_renditions(self):
+        with mock.patch('blogs.signals.queue_renditions') as queue_renditions:
+            image = get_image_model().objects.create(title="Upload", file=get_test_image_file())
+            queue_renditions.assert_called_once_with([image.pk])
+
+            queue_renditions.reset_mock()
+            # What loaddata sends
+            post_save.send(get_image_model(), instance=image, created=True, raw=True, using='default')
+            self.assertFalse(queue_renditions.called)
+
+
+class CursorPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        for n in range(5):
+            post = self.index.add_child(instance=BlogPage(
+                title="Post %s" % n, slug="post-%s" % n, date=datetime.date.today(),
+                body=[('paragraph', '<p>Hello</p>')],
+            ))
+            post.save_revision().publish()
+        self.posts = BlogPage.objects.live()
+
+    def paginate(self, with_count=True, **params):
+        request = RequestFactory().get('/blog/', params)
+        return paginate_item(
+            request, self.posts, 2, keyset=True, with_count=with_count, count_signature={'parent': self.index.pk},
+        )
+
+    def test_cursor_pages_number_themselves(self):
+        second = self.paginate(cursor=self.paginate().next_cursor)
+        self.assertIsInstance(second, CursorPage)
+        self.assertEqual(second.number, 2)
+        self.assertEqual(second.paginator.count, 5)
+        self.assertEqual(second.paginator.num_pages, 3)
+        self.assertEqual(second.previous_page_number(), 1)
+        self.assertEqual(second.next_page_number(), 3)
+
+        last = self.paginate(cursor=second.next_cursor)
+        self.assertEqual(len(last), 1)
+        self.assertEqual(last.number, 3)
+        self.assertFalse(last.has_next())
+        with self.assertRaises(EmptyPage):
+            last.next_page_number()
+
+        back = self.paginate(cursor=last.previous_cursor)
+        self.assertEqual([post.pk for post in back], [post.pk for post in second])
+        self.assertEqual(back.number, 2)
+
+    def test_uncounted_pages_are_not_numbered(self):
+        cursor = self.paginate().next_cursor
+        with self.assertNumQueries(1):
+            second = self.paginate(with_count=False, cursor=cursor)
+            self.assertIsNone(second.count)
+            self.assertIsNone(second.number)
+            self.assertIsNone(second.next_page_number())
+        self.assertEqual(second.next_cursor, self.paginate(cursor=cursor).next_cursor)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class PrimeStreamsTests(TestCase):
+    def setUp(self):
+        self.images = [
+            get_image_model().objects.create(title="Image %s" % n, file=get_test_image_file())
+            for n in range(3)
+        ]
+
+    def body(self, *image_ids):
+        # As loaded from the db: raw json, nothing converted yet
+        return BlogPage(body=json.dumps(
+            [{'type': 'paragraph', 'value': '<p>Hello</p>'}]
+            + [{'type': 'image', 'value': {'image': image_id, 'caption': 'c'}} for image_id in image_ids]
+        )).body
+
+    def test_images_of_every_stream_in_two_queries(self):
+        bodies = [self.body(self.images[0].pk), self.body(self.images[1].pk, self.images[2].pk), self.body()]
+        with self.assertNumQueries(2):
+            prime_streams(bodies)
+
+        with self.assertNumQueries(0):
+            chosen = [block.value['image'] for body in bodies for block in body if block.block_type == 'image']
+            self.assertEqual(chosen, self.images)
+            list(chosen[0].renditions.all())
+            self.assertEqual(bodies[1][2].value['caption'], 'c')
+            self.assertEqual(str(bodies[0][0].value), '<p>Hello</p>')
+
+    def test_missing_images_become_none(self):
+        body = self.body(self.images[0].pk, 999999)
+        prime_streams([body])
+        with self.assertNumQueries(0):
+            self.assertIsNone(body[2].value['image'])
+
+    def test_streams_built_in_python_are_left_alone(self):
+        body = BlogPage(body=[('paragraph', '<p>Hello</p>')]).body
+        with self.assertNumQueries(0):
+            self.assertEqual(prime_streams([body, None]), {})
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class PageCachePurgeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.get(is_default_site=True)
+        self.index = self.site.root_page.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.news = BlogCategory.objects.create(name="News")
+        self.sport = BlogCategory.objects.create(name="Sport")
+
+    def route_version(self, category):
+        site_id, root_url, path = self.index.get_url_parts()
+        return namespace_version(path_namespace(site_id, path + 'category/%s/' % category.slug))
+
+    def test_publish_purges_the_categories_left_and_joined(self):
+        post = self.index.add_child(instance=BlogPage(
+            title="Post", slug="post", date=datetime.date.today(), body=[('paragraph', '<p>Hi</p>')],
+        ))
+        post.categories = [self.news]
+        post.save_revision().publish()
+        news, sport = self.route_version(self.news), self.route_version(self.sport)
+
+        post = BlogPage.objects.get(pk=post.pk)
+        post.categories = [self.sport]
+        post.save_revision().publish()
+
+        self.assertGreater(self.route_version(self.news), news)
+        self.assertGreater(self.route_version(self.sport), sport)
+
+
+class PageCacheValidatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site = Site.objects.get(is_default_site=True)
+        self.index = site.root_page.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.path = self.index.get_url_parts()[2]
+
+        request = self.request()
+        response = HttpResponse("cached listing")
+        response['ETag'] = 'W/"listing"'
+        response['Last-Modified'] = 'Wed, 21 Oct 2026 07:28:00 GMT'
+        store_response(request, page_cache_key(request), response, self.index)
+
+    def request(self, **headers):
+        request = RequestFactory().get(self.path, **headers)
+        request.user = AnonymousUser()
+        return request
+
+    def serve(self, request):
+        # A hit is answered before ConditionalPageMixin works out the page's validators
+        with mock.patch.object(BlogIndexPage, 'get_validators', side_effect=AssertionError):
+            return self.index.serve(request)
+
+    def test_hits_carry_the_stored_validators(self):
+        response = self.serve(self.request())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"cached listing")
+        self.assertEqual(response['ETag'], 'W/"listing"')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_every_tag_and_match_are_part_of_the_key(self):
+        request = self.request(QUERY_STRING='tag=a&tag=b')
+        store_response(request, page_cache_key(request), HttpResponse("a and b"), self.index)
+        request = self.request(QUERY_STRING='tag=b')
+        store_response(request, page_cache_key(request), HttpResponse("b"), self.index)
+
+        def cached(query_string):
+            request = self.request(QUERY_STRING=query_string)
+            response = cached_response(request, page_cache_key(request))
+            return response and response.content
+
+        self.assertEqual(cached('tag=a&tag=b'), b"a and b")
+        self.assertEqual(cached('tag=b&tag=a'), b"a and b")
+        self.assertEqual(cached('tag=b'), b"b")
+        self.assertIsNone(cached('tag=a&tag=b&match=any'))
+
+    def test_conditional_gets_are_answered_from_the_cache(self):
+        response = self.serve(self.request(HTTP_IF_NONE_MATCH='W/"listing"'))
+        self.assertEqual(response.status_code, 304)
+
+        response = self.serve(self.request(HTTP_IF_MODIFIED_SINCE='Wed, 21 Oct 2026 07:28:00 GMT'))
+        self.assertEqual(response.status_code, 304)
+
+        response = self.serve(self.request(HTTP_IF_NONE_MATCH='W/"stale"'))
+        self.assertEqual(response.status_code, 200)
+
+
+# Publishes run their on_commit callbacks here, so index them then rather than from a timer
+@override_settings(BLOG_SEARCH_INDEX_DELAY=0)
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site = Site.objects.get(is_default_site=True)
+        self.index = site.root_page.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.path = self.index.get_url_parts()[2]
+        self.posts = [self.publish("Post %s" % n) for n in range(2)]
+
+    def publish(self, title):
+        post = self.index.add_child(instance=BlogPage(
+            title=title, slug=title.lower().replace(' ', '-'), date=datetime.date.today(),
+            body=[('paragraph', '<p>Hi</p>')],
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save_revision().publish()
+        return post
+
+    def serve(self, **headers):
+        request = RequestFactory().get(self.path, **headers)
+        request.user = AnonymousUser()
+        with mock.patch.object(RoutablePageMixin, 'serve', return_value=HttpResponse("listing")):
+            return self.index.serve(request)
+
+    def test_unpublishing_the_newest_post_is_a_modification(self):
+        last_modified = self.serve()['Last-Modified']
+        self.assertEqual(self.serve(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # A while later, Last-Modified only having whole seconds
+        later = time.time() + 60
+        with mock.patch('blogs.utils.cache.time.time', return_value=later):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.posts[-1].unpublish()
+        response = self.serve(HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.serve(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+
+@override_settings(BLOG_SEARCH_INDEX_DELAY=0)
+class AuthorPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.user = get_user_model().objects.create_user("writer", password="secret")
+        self.index = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.author = root.add_child(instance=AuthorPage(
+            title="Writer", slug="writer", user=self.user, bio=[('paragraph', '<p>Hello</p>')],
+        ))
+
+    def publish(self, title):
+        post = self.index.add_child(instance=BlogPage(
+            title=title, slug=slugify(title), date=datetime.date.today(), author=self.user,
+            body=[('paragraph', '<p>%s</p>' % title)],
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.save_revision().publish()
+        return post
+
+    @override_settings(BLOG_AUTHOR_RECENT_POSTS=2)
+    def test_recent_posts_are_materialized_on_publish(self):
+        first = self.publish("First")
+        self.publish("Second")
+        self.publish("Third")
+
+        with self.assertNumQueries(0):
+            entry = author_posts(self.user.pk)
+        self.assertEqual([card['title'] for card in entry['posts']], ["Third", "Second"])
+        self.assertEqual(entry['count'], 3)
+        self.assertEqual(entry['posts'][0]['excerpt'], "Third")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.unpublish()
+        self.assertEqual(author_posts(self.user.pk)['count'], 2)
+
+    def test_bio_is_cached_until_the_next_publish(self):
+        self.assertIn("Hello", author_bio(self.author))
+        with self.assertNumQueries(0):
+            self.assertIn("Hello", author_bio(self.author))
+
+        self.author.bio = [('paragraph', '<p>Goodbye</p>')]
+        self.author.save_revision().publish()
+        self.assertIn("Goodbye", author_bio(AuthorPage.objects.get(pk=self.author.pk)))
+
+    def test_context_is_served_from_the_caches(self):
+        for n in range(3):
+            self.publish("Post %s" % n)
+        request = RequestFactory().get('/writer/')
+        request.user = AnonymousUser()
+        self.author.get_context(request)
+
+        with self.assertNumQueries(0):
+            context = self.author.get_context(request)
+        self.assertEqual(len(context['recent_blogs']), 3)
+        self.assertIn("Hello", context['bio_html'])
+
+
+class AuthorDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.root = Site.objects.get(is_default_site=True).root_page
+        self.ana = self.add_author("Ana", "Spanish, English , spanish", "Madrid,  Spain")
+        self.bo = self.add_author("Bo", "English", "Oslo")
+        self.cy = self.add_author("Cy", "", None)
+
+    def add_author(self, name, languages, location):
+        user = get_user_model().objects.create_user(name.lower(), password="secret")
+        return self.root.add_child(instance=AuthorPage(
+            title=name, slug=name.lower(), user=user, bio=[], languages=languages, location=location,
+        ))
+
+    def details(self, author):
+        author = AuthorPage.objects.get(pk=author.pk)
+        location = author.author_location
+        return sorted(language.slug for language in author.author_languages.all()), location and location.name
+
+    def test_saving_normalizes_the_free_text(self):
+        self.assertEqual(self.details(self.ana), (['english', 'spanish'], "Madrid, Spain"))
+        self.assertEqual(self.details(self.cy), ([], None))
+        self.assertEqual(AuthorLanguage.objects.count(), 2)
+
+        self.bo.languages = "Norwegian"
+        self.bo.save(update_fields=['languages'])
+        self.assertEqual(self.details(self.bo), (['norwegian'], "Oslo"))
+
+    def test_backfill_rebuilds_the_relations(self):
+        AuthorPage.author_languages.through.objects.all().delete()
+        AuthorPage.objects.update(author_location=None)
+
+        self.assertEqual(backfill_author_details(AuthorPage, AuthorLanguage, AuthorLocation), (3, 2, 2))
+        self.assertEqual(self.details(self.ana), (['english', 'spanish'], "Madrid, Spain"))
+        self.assertEqual(self.details(self.bo), (['english'], "Oslo"))
+        self.assertEqual(AuthorLocation.objects.count(), 2)
+
+    def directory(self, **params):
+        response = self.client.get(reverse('author_directory'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_directory_filters_by_slug_or_name(self):
+        everyone = self.directory()
+        self.assertEqual([author['name'] for author in everyone['authors']], ["Ana", "Bo", "Cy"])
+
+        english = self.directory(language="English")
+        self.assertEqual([author['name'] for author in english['authors']], ["Ana", "Bo"])
+        self.assertEqual(english['count'], 2)
+
+        madrid = self.directory(language="english", location="Madrid, Spain")
+        self.assertEqual(madrid['filters'], {'language': 'english', 'location': 'madrid-spain'})
+        self.assertEqual(madrid['authors'], [{
+            'name': "Ana", 'url': self.ana.url, 'location': "Madrid, Spain", 'languages': ["English", "Spanish"],
+        }])
@@ -0,0 +1,182 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils.safestring import mark_safe
+from django.utils.text import slugify
+
+from blogs.utils.cache import namespace_key
+from blogs.utils.choosers import prime_streams
+from blogs.utils.conditional import queryset_freshness
+from blogs.utils.paginate import paginate_item
+
+
+# Every author's materialized recent posts; bumped on each post publish/unpublish,
+# since a post can change authors between revisions
+AUTHOR_POSTS_NAMESPACE = 'blog-author-posts'
+# Rendered bios, keyed by page and live revision so a publish moves on by itself
+AUTHOR_BIO_NAMESPACE = 'blog-author-bio'
+
+
+def post_card(post):
+    """What an author page shows of a post, without the post"""
+    return {
+        'id': post.pk,
+        'title': post.title,
+        'url': post.url,
+        'date': post.date,
+        'first_published_at': post.first_published_at,
+        'excerpt': post.excerpt,
+        'reading_time': post.reading_time,
+        'image': post.image,
+    }
+
+
+def build_author_posts(user_id):
+    """
+    {'posts': [card, ...], 'newest': last publish, 'count': posts} for an author's live,
+    public posts, the newest BLOG_AUTHOR_RECENT_POSTS of them as cards. Two queries.
+    """
+    from blogs.models import BlogPage
+
+    posts = BlogPage.objects.live().public().filter(author_id=user_id, first_published_at__isnull=False)
+    newest, count = queryset_freshness(posts)
+    recent = (
+        posts.select_related('image')
+        .defer('body')
+        .order_by('-first_published_at', '-id')[:getattr(settings, 'BLOG_AUTHOR_RECENT_POSTS', 7)]
+    )
+    return {'posts': [post_card(post) for post in recent], 'newest': newest, 'count': count}
+
+
+def refresh_author_posts(user_id):
+    """Materialize an author's recent posts now, e.g. right after they publish"""
+    entry = build_author_posts(user_id)
+    cache.set(
+        namespace_key(AUTHOR_POSTS_NAMESPACE, {'author': user_id}),
+        entry,
+        getattr(settings, 'BLOG_AUTHOR_CACHE_TIMEOUT', 60 * 60),
+    )
+    return entry
+
+
+def author_posts(user_id):
+    """An author's materialized recent posts, rebuilt when a publish has moved the namespace on"""
+    entry = cache.get(namespace_key(AUTHOR_POSTS_NAMESPACE, {'author': user_id}))
+    if entry is None:
+        entry = refresh_author_posts(user_id)
+    return entry
+
+
+def recent_post_cards(entry):
+    """The cards of an entry, their images' renditions fetched fresh in one query"""
+    cards = entry['posts']
+    prefetch_related_objects([card['image'] for card in cards if card['image']], 'renditions')
+    return cards
+
+
+def author_bio(page):
+    """The rendered bio StreamField of a live AuthorPage, cached until its next publish"""
+    key = namespace_key(AUTHOR_BIO_NAMESPACE, {'page': page.pk, 'revision': page.live_revision_id})
+    html = cache.get(key)
+    if html is None:
+        prime_streams([page.bio])
+        html = str(page.bio.render_as_block())
+        cache.set(key, html, getattr(settings, 'BLOG_AUTHOR_CACHE_TIMEOUT', 60 * 60))
+    return mark_safe(html)
+
+
+def language_terms(text):
+    """[(slug, name)] for a comma-separated list of languages, blanks and repeats dropped"""
+    terms = {}
+    for name in (text or '').split(','):
+        name = ' '.join(name.split())
+        slug = slugify(name, allow_unicode=True)
+        if slug and slug not in terms:
+            terms[slug] = name
+    return list(terms.items())
+
+
+def location_terms(text):
+    """[(slug, name)] for a location, the whole string being one place; [] when blank"""
+    name = ' '.join((text or '').split())
+    slug = slugify(name, allow_unicode=True)
+    return [(slug, name)] if slug else []
+
+
+def term_rows(model, terms):
+    """The AuthorLanguage / AuthorLocation rows for [(slug, name)], created as needed, in order"""
+    rows = model.objects.in_bulk([slug for slug, name in terms], field_name='slug')
+    missing = [model(slug=slug, name=name) for slug, name in terms if slug not in rows]
+    if missing:
+        # Another save may be creating the same rows; theirs win, then read everything back
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+        rows = model.objects.in_bulk([slug for slug, name in terms], field_name='slug')
+    return [rows[slug] for slug, name in terms]
+
+
+def backfill_author_details(author_model, language_model, location_model):
+    """
+    Fill in author_languages / author_location of every AuthorPage from its free-text fields,
+    straight to the tables (no save(), no revisions). Takes the models so migrations can
+    pass their historical ones. Returns (authors, languages, locations).
+    """
+    authors = list(author_model.objects.order_by('pk').only('id', 'languages', 'location'))
+
+    # All the lookup rows in two passes rather than per author
+    languages = {
+        language.slug: language
+        for language in term_rows(language_model, list(dict(
+            term for author in authors for term in language_terms(author.languages)
+        ).items()))
+    }
+    locations = {
+        location.slug: location
+        for location in term_rows(location_model, list(dict(
+            term for author in authors for term in location_terms(author.location)
+        ).items()))
+    }
+
+    Through = author_model._meta.get_field('author_languages').remote_field.through
+    links = [
+        Through(authorpage_id=author.pk, authorlanguage_id=languages[slug].pk)
+        for author in authors
+        for slug, name in language_terms(author.languages)
+    ]
+    for author in authors:
+        location = location_terms(author.location)
+        author.author_location = locations[location[0][0]] if location else None
+
+    with transaction.atomic():
+        Through.objects.filter(authorpage_id__in=[author.pk for author in authors]).delete()
+        Through.objects.bulk_create(links)
+        author_model.objects.bulk_update(authors, ['author_location'], batch_size=500)
+    return len(authors), len(languages), len(locations)
+
+
+def author_directory(request, num=20):
+    """
+    Return (filters, page of AuthorPages) for ?language= / ?location= (slugs or names)
+    and ?page=x. Each filter is a lookup on the unique slug and then the relation's index;
+    totals are cached until the next publish.
+    """
+    from blogs.models import AuthorPage
+
+    filters = {
+        name: slugify(' '.join(request.GET[name].split()), allow_unicode=True)
+        for name in ('language', 'location') if request.GET.get(name)
+    }
+    authors = AuthorPage.objects.live().public()
+    if 'language' in filters:
+        authors = authors.filter(author_languages__slug=filters['language'])
+    if 'location' in filters:
+        authors = authors.filter(author_location__slug=filters['location'])
+    authors = (
+        authors.select_related('author_location')
+        .prefetch_related('author_languages')
+        .defer('bio')
+        .order_by('title', 'id')
+    )
+
+    signature = dict(filters, directory='authors')
+    return filters, paginate_item(request, authors, num, count_signature=signature)
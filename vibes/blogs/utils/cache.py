@@ -0,0 +1,54 @@
+import datetime
+import hashlib
+import math
+import time
+
+from django.core.cache import cache
+
+
+# Cached listing data is namespaced by a version number that lives in the cache.
+# Bumping the version on publish/unpublish orphans every old entry at once, so we
+# never have to track down individual keys.
+VERSION_KEY = 'vibes-cache-version:%s'
+# When each namespace was last bumped, for Last-Modified headers
+BUMPED_KEY = 'vibes-cache-bumped:%s'
+
+
+def namespace_version(namespace):
+    """Return the current version of a cache namespace"""
+    version = cache.get(VERSION_KEY % namespace)
+    if version is None:
+        version = 1
+        cache.add(VERSION_KEY % namespace, version, None)
+    return version
+
+
+def bump_namespace(namespace):
+    """Invalidate everything cached under a namespace; returns the new version"""
+    # Rounded up, since Last-Modified only has whole seconds
+    cache.set(BUMPED_KEY % namespace, math.ceil(time.time()), None)
+    try:
+        return cache.incr(VERSION_KEY % namespace)
+    except ValueError:
+        # The version was evicted (or never set); anything older is gone with it
+        cache.set(VERSION_KEY % namespace, 2, None)
+        return 2
+
+
+def namespace_bumped_at(*namespaces):
+    """When any of some namespaces was last bumped (an aware datetime), or None if none ever was"""
+    stamps = cache.get_many([BUMPED_KEY % namespace for namespace in namespaces]).values()
+    if not stamps:
+        return None
+    return datetime.datetime.fromtimestamp(max(stamps), tz=datetime.timezone.utc)
+
+
+def namespace_key(namespace, signature=None):
+    """
+    Build a cache key for a namespace and a signature dict such as
+    {'parent': 3, 'featured': True}. Hashed, so tag names etc. are always key-safe.
+    """
+    signature = signature or {}
+    raw = '&'.join('%s=%s' % (name, signature[name]) for name in sorted(signature))
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return '%s:%s:%s' % (namespace, namespace_version(namespace), digest)
@@ -0,0 +1,104 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from blogs.utils.cache import namespace_key, namespace_version
+from blogs.utils.paginate import paginate_item
+
+
+# Slug -> category lookups; bumped when a category is saved or deleted
+CATEGORY_NAMESPACE = 'blog-category'
+# Post ids per category; bumped on every publish/unpublish
+CATEGORY_POSTS_NAMESPACE = 'blog-category-posts'
+
+# Cached stand-in for "no such category", so repeated bad URLs don't reach the db
+MISSING = 'missing'
+
+
+# In-process copy of the category list as (version, checked at, categories).
+# Swapped as a whole so threads never see half an update.
+_snapshot = (None, 0, [])
+
+
+def all_categories():
+    """
+    Every BlogCategory (with its icon), for sidebars and filters.
+
+    Served from the in-process snapshot while its version matches the shared cache's,
+    so steady state costs no queries. The version is only re-read every
+    BLOG_CATEGORY_SNAPSHOT_RECHECK seconds; on a mismatch the list comes from the
+    shared cache, and only from the db when that is cold too.
+    """
+    from blogs.models import BlogCategory
+
+    global _snapshot
+    version, checked, categories = _snapshot
+    now = time.monotonic()
+    if version is not None and now - checked < getattr(settings, 'BLOG_CATEGORY_SNAPSHOT_RECHECK', 5):
+        return categories
+
+    current = namespace_version(CATEGORY_NAMESPACE)
+    if current != version:
+        key = namespace_key(CATEGORY_NAMESPACE, {'list': 'all'})
+        categories = cache.get(key)
+        if categories is None:
+            categories = list(BlogCategory.objects.select_related('icon').order_by('pk'))
+            cache.set(key, categories, getattr(settings, 'BLOG_CATEGORY_CACHE_TIMEOUT', 60 * 60))
+
+    _snapshot = (current, now, categories)
+    return categories
+
+
+def drop_category_snapshot():
+    """Forget this process's copy of the category list (other processes notice the version bump)"""
+    global _snapshot
+    _snapshot = (None, 0, [])
+
+
+def get_category_or_404(cat_slug):
+    """Resolve a /category/<slug>/ to a BlogCategory through the slug index, cached"""
+    from blogs.models import BlogCategory
+
+    key = namespace_key(CATEGORY_NAMESPACE, {'slug': cat_slug})
+    category = cache.get(key)
+    if category is None:
+        category = BlogCategory.objects.filter(slug=cat_slug).first() or MISSING
+        cache.set(key, category, getattr(settings, 'BLOG_CATEGORY_CACHE_TIMEOUT', 60 * 60))
+
+    if category == MISSING:
+        raise Http404("No blog category matches %r" % cat_slug)
+    return category
+
+
+def category_post_ids(category):
+    """Ids of the live, public posts in a category, newest first, cached until the next publish"""
+    from blogs.models import BlogPage
+
+    key = namespace_key(CATEGORY_POSTS_NAMESPACE, {'category': category.pk})
+    post_ids = cache.get(key)
+    if post_ids is None:
+        post_ids = list(
+            BlogPage.objects.live().public()
+            .filter(categories=category)
+            .order_by('-first_published_at', '-id')
+            .values_list('id', flat=True)
+        )
+        cache.set(key, post_ids, getattr(settings, 'BLOG_CATEGORY_CACHE_TIMEOUT', 60 * 60))
+    return post_ids
+
+
+def category_listing(request, cat_slug, num=10):
+    """
+    Return (category, page of posts) for a category listing.
+    Pagination runs over the cached id list, so only the posts on the page are fetched.
+    """
+    from blogs.models import BlogPage
+
+    category = get_category_or_404(cat_slug)
+    page = paginate_item(request, category_post_ids(category), num)
+
+    posts = BlogPage.objects.filter(pk__in=list(page.object_list)).for_listing().in_bulk()
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return category, page
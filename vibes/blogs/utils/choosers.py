@@ -0,0 +1,65 @@
+from django.db.models import prefetch_related_objects
+
+from wagtail.blocks import StructBlock
+from wagtail.images import get_image_model
+from wagtail.images.blocks import ImageChooserBlock
+
+
+def collect_image_ids(block, value, image_ids):
+    """Add the image ids chosen anywhere in a raw block value (image choosers, also inside struct blocks)"""
+    if isinstance(block, ImageChooserBlock):
+        if value:
+            image_ids.add(value)
+    elif isinstance(block, StructBlock) and isinstance(value, dict):
+        for name, child_block in block.child_blocks.items():
+            collect_image_ids(child_block, value.get(name), image_ids)
+
+
+def stream_image_ids(streams):
+    """The ids of every image chosen in some StreamFields, read from their raw json"""
+    image_ids = set()
+    for stream in streams:
+        for item in stream.raw_data:
+            block = stream.stream_block.child_blocks.get(item['type'])
+            if block is not None:
+                collect_image_ids(block, item['value'], image_ids)
+    return image_ids
+
+
+def resolved_value(block, value, images):
+    """
+    block.to_python(value), with image choosers answered from images ({id: image})
+    instead of a query each. Other blocks convert as usual.
+    """
+    if isinstance(block, ImageChooserBlock):
+        return images.get(value) if value else None
+    if isinstance(block, StructBlock) and isinstance(value, dict):
+        return block._to_struct_value([
+            (
+                name,
+                resolved_value(child_block, value[name], images) if name in value else child_block.get_default(),
+            )
+            for name, child_block in block.child_blocks.items()
+        ])
+    return block.to_python(value)
+
+
+def prime_streams(streams):
+    """
+    Resolve every image chosen in some StreamFields about to be rendered (e.g. the bodies
+    of a page of posts) with one in_bulk and one renditions query, and prime the blocks with
+    them so rendering looks nothing up. Streams that were already converted are left alone.
+    Returns {id: image}.
+    """
+    streams = [stream for stream in streams if stream is not None and stream.is_lazy]
+
+    image_ids = stream_image_ids(streams)
+    images = get_image_model().objects.in_bulk(image_ids) if image_ids else {}
+    prefetch_related_objects(list(images.values()), 'renditions')
+
+    for stream in streams:
+        for position, item in enumerate(list(stream.raw_data)):
+            block = stream.stream_block.child_blocks.get(item['type'])
+            if block is not None:
+                stream[position] = (item['type'], resolved_value(block, item['value'], images), item.get('id'))
+    return images
@@ -0,0 +1,159 @@
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from wagtail.models import Site
+
+from blogs.utils.cache import bump_namespace, namespace_key, namespace_version
+
+
+# Every cached page lives under this namespace, plus one per (site, path) so a
+# publish can drop all the ?page= / ?tag= variants of a path at once
+PAGE_CACHE_NAMESPACE = 'page-cache'
+
+# The only query params our pages read; anything else (utm_* etc.) shares the entry
+CACHED_QUERY_PARAMS = ('page', 'featured', 'tag', 'match', 'cursor')
+
+# What {% csrf_token %} renders. Cached copies get the visitor's own token swapped in.
+CSRF_INPUT = re.compile(rb'(<input type="hidden" name="csrfmiddlewaretoken" value=")[^"]*(">)')
+
+# Validators set by ConditionalPageMixin, kept with the cached copy to answer conditional GETs
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def path_namespace(site_id, path):
+    return '%s:%s:%s' % (PAGE_CACHE_NAMESPACE, site_id, path)
+
+
+def is_cacheable_request(request):
+    """Only anonymous GETs of the live site are cached"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if getattr(request, 'is_preview', False):
+        return False
+    user = getattr(request, 'user', None)
+    return user is None or not user.is_authenticated
+
+
+def page_cache_key(request):
+    site = Site.find_for_request(request)
+    # Repeatable params (?tag=a&tag=b) key on all their values, in any order
+    signature = {
+        name: sorted(request.GET.getlist(name)) for name in CACHED_QUERY_PARAMS if name in request.GET
+    }
+    signature['all'] = namespace_version(PAGE_CACHE_NAMESPACE)
+    return namespace_key(path_namespace(site.pk if site else None, request.path), signature)
+
+
+def cached_response(request, key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+
+    content, content_type, uses_csrf, validators = entry
+    # Conditional GETs are answered from the validators the page had when it was cached
+    last_modified = validators.get('Last-Modified')
+    response = get_conditional_response(
+        request,
+        etag=validators.get('ETag'),
+        last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+    )
+    if response is not None:
+        response['X-Page-Cache'] = 'hit'
+        return response
+
+    if uses_csrf:
+        # Hand this visitor their own token (and the cookie that goes with it)
+        token = get_token(request).encode()
+        content = CSRF_INPUT.sub(lambda match: match.group(1) + token + match.group(2), content)
+
+    response = HttpResponse(content, content_type=content_type)
+    for header, value in validators.items():
+        response[header] = value
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def store_response(request, key, response, page):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    if page.get_view_restrictions().exists():
+        return
+
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+
+    uses_csrf = bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+    if uses_csrf and not CSRF_INPUT.search(response.content):
+        # The token went out some other way we can't patch up, so don't share this page
+        return
+
+    validators = {header: response[header] for header in VALIDATOR_HEADERS if header in response}
+    cache.set(
+        key,
+        (response.content, response['Content-Type'], uses_csrf, validators),
+        getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 60 * 10),
+    )
+    response['X-Page-Cache'] = 'miss'
+
+
+class CachedPageMixin(object):
+    """
+    Serve anonymous GETs of the page (and its sub-routes) from the page cache.
+    Must come first in the bases so it wraps ConditionalPageMixin and RoutablePageMixin.serve:
+    a hit then answers conditional GETs from the validators stored with it, without
+    running get_validators().
+    """
+
+    def serve(self, request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return super().serve(request, *args, **kwargs)
+
+        key = page_cache_key(request)
+        response = cached_response(request, key)
+        if response is not None:
+            return response
+
+        response = super().serve(request, *args, **kwargs)
+        store_response(request, key, response, self)
+        return response
+
+
+def purge_page_cache(page, category_slugs=()):
+    """
+    Drop the cached copies that a publish/unpublish of page can change: the page itself,
+    the index above it, the home page, the category routes for its categories (and for
+    category_slugs, the ones it was listed under before a publish) and the tag index pages.
+    """
+    from blogs.models import BlogPage, BlogTagIndexPage
+
+    page = page.specific
+    parent = page.get_parent()
+    site = page.get_site()
+    home = site.root_page if site else None
+    listings = [target for target in (parent, home) if target is not None]
+
+    routes = [(target, '') for target in [page] + listings]
+    routes += [(target, '') for target in BlogTagIndexPage.objects.all()]
+
+    if isinstance(page, BlogPage):
+        slugs = set(category_slugs) | {category.slug for category in page.categories.all()}
+        for slug in sorted(slugs):
+            for target in [page] + listings:
+                routes.append((target, 'category/%s/' % slug))
+
+    for target, suffix in routes:
+        url_parts = target.get_url_parts()
+        if url_parts is None:
+            continue
+        site_id, root_url, path = url_parts
+        bump_namespace(path_namespace(site_id, path + suffix))
+
+
+def purge_all_pages():
+    bump_namespace(PAGE_CACHE_NAMESPACE)
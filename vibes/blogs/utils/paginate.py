@@ -1,13 +1,181 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import Paginator, EmptyPage, InvalidPage, PageNotAnInteger
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from blogs.utils.cache import namespace_key
+
+
+# Keyset pagination walks the listing newest first, using the id as a tie-breaker
+# for posts published in the same instant
+KEYSET_ORDERING = ('-first_published_at', '-id')
+
+
+def encode_cursor(obj, reverse=False):
+    """Turn the (first_published_at, id) of an item into an opaque ?cursor= token"""
+    payload = [obj.first_published_at.isoformat(), obj.pk, int(reverse)]
+    token = base64.urlsafe_b64encode(json.dumps(payload).encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return (first_published_at, id, reverse) for a ?cursor= token, or None if it is garbage"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        published, pk, reverse = json.loads(base64.urlsafe_b64decode(padded))
+        published = parse_datetime(published)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+    if published is None:
+        return None
+    return published, pk, bool(reverse)
+
+
+COUNT_NAMESPACE = 'blog-count'
+
+
+def cached_count(queryset, signature):
+    """
+    Count a listing once per publish instead of once per request.
+    signature describes the listing, e.g. {'parent': 3, 'featured': False, 'category': None, 'tag': None}
+    """
+    key = namespace_key(COUNT_NAMESPACE, signature)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'BLOG_COUNT_CACHE_TIMEOUT', 60 * 60))
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator that takes its total from the listing count cache"""
+
+    def __init__(self, object_list, per_page, count_signature, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_signature = count_signature
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list, self.count_signature)
+
+
+def listed_before(item, published, pk):
+    """The rows of a keyset-ordered listing that come before (first_published_at, id)"""
+    return item.filter(Q(first_published_at__gt=published) | Q(first_published_at=published, id__gt=pk))
+
+
+def listed_after(item, published, pk):
+    """The rows of a keyset-ordered listing that come after (first_published_at, id)"""
+    return item.filter(Q(first_published_at__lt=published) | Q(first_published_at=published, id__lt=pk))
+
+
+class CursorPage(object):
+    """
+    A page of results fetched by seeking past a cursor instead of using OFFSET.
+    Quacks like django's Page for templates, but links to its neighbours with
+    next_cursor / previous_cursor (None at either end of the listing).
+    number is only known when the page was counted (with_count): it counts the rows
+    ahead of the page the first time it is asked for, so it costs as much as the depth
+    and may not line up with ?page=x. Otherwise number and the page numbers are None.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None, count=None, preceding=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # None when the caller asked us not to count
+        self.count = count
+        # The rows listed before this page, counted for number; None leaves number unset
+        self.preceding = preceding
+
+    @cached_property
+    def number(self):
+        if self.preceding is None:
+            return None
+        return self.preceding.count() // self.paginator.per_page + 1
+
+    def __repr__(self):
+        return '<CursorPage of %s items>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        if not self.has_next():
+            raise EmptyPage('That page contains no results')
+        return None if self.number is None else self.number + 1
+
+    def previous_page_number(self):
+        if not self.has_previous():
+            raise EmptyPage('That page number is less than 1')
+        return None if self.number is None else max(self.number - 1, 1)
+
+
+def make_paginator(item, num, count_signature=None):
+    """A Paginator, taking its total from the listing count cache when given a count_signature"""
+    if count_signature is None:
+        return Paginator(item, num)
+    return CachedCountPaginator(item, num, count_signature)
 
 
 class BlogPagination(object):
-    def __call__(self, request, item, num):
-        """Custom paginate"""
+    def __call__(self, request, item, num, keyset=False, with_count=True, count_signature=None):
+        """
+        Custom paginate
 
+        With keyset=True a ?cursor= token fetches the page with an indexed seek on
+        (first_published_at, id), so deep pages cost the same as the first one.
+        Without a cursor (or with a broken one) we fall back to ?page=x.
+        with_count=False skips the COUNT(*) for cursor pages.
+        Passing a count_signature (see cached_count) caches the total until the next publish.
+        """
+
+        if not keyset:
+            return self.paginate_by_number(request, item, num, count_signature)
+
+        item = item.filter(first_published_at__isnull=False).order_by(*KEYSET_ORDERING)
+
+        cursor = decode_cursor(request.GET.get("cursor", ""))
+        if cursor is not None:
+            page_items = self.paginate_by_cursor(item, num, cursor, with_count, count_signature)
+            if page_items is not None:
+                return page_items
+
+        # Hand out cursors from the numbered page, so the next hop is a seek
+        page_items = self.paginate_by_number(request, item, num, count_signature)
+        page_items.next_cursor = encode_cursor(page_items[-1]) if page_items.has_next() else None
+        page_items.previous_cursor = (
+            encode_cursor(page_items[0], reverse=True) if page_items.has_previous() else None
+        )
+        return page_items
+
+    def paginate_by_number(self, request, item, num, count_signature=None):
         # Paginate all posts by "num" per page
         # put this in settings
-        paginator = Paginator(item, num)
+        paginator = make_paginator(item, num, count_signature)
         # Try to get the ?page=x value
         page = request.GET.get("page")
         try:
@@ -21,7 +189,37 @@ class BlogPagination(object):
             # Then return the last page
             page_items = paginator.page(paginator.num_pages)
 
-
         return page_items
 
+    def paginate_by_cursor(self, item, num, cursor, with_count=True, count_signature=None):
+        published, pk, reverse = cursor
+
+        if reverse:
+            # Walking back: take the rows just above the cursor, oldest first, then flip them
+            rows = listed_before(item, published, pk).order_by('first_published_at', 'id')
+        else:
+            rows = listed_after(item, published, pk)
+
+        # Fetch one extra row to know whether there is anything beyond this page
+        rows = list(rows[:num + 1])
+        has_more = len(rows) > num
+        rows = rows[:num]
+        if not rows:
+            # The cursor points past either end, let the caller start over
+            return None
+
+        if reverse:
+            rows.reverse()
+            next_cursor = encode_cursor(rows[-1])
+            previous_cursor = encode_cursor(rows[0], reverse=True) if has_more else None
+        else:
+            next_cursor = encode_cursor(rows[-1]) if has_more else None
+            previous_cursor = encode_cursor(rows[0], reverse=True)
+
+        paginator = make_paginator(item, num, count_signature)
+        count = paginator.count if with_count else None
+        # Numbering the page means counting everything ahead of it, only done when counting anyway
+        preceding = listed_before(item, rows[0].first_published_at, rows[0].pk) if with_count else None
+        return CursorPage(rows, paginator, next_cursor, previous_cursor, count, preceding)
+
 paginate_item = BlogPagination()
@@ -0,0 +1,145 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from PIL import Image as PILImage
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from blogs.utils.choosers import stream_image_ids
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Images queued or being generated right now, so a burst of saves resizes each once
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def rendition_widths(image):
+    """
+    The declared widths worth generating for an image: every one narrower than it, then the
+    first that isn't, which wagtail leaves at the image's own size (it never upscales)
+    """
+    widths = []
+    for width in sorted(getattr(settings, 'BLOG_RENDITION_WIDTHS', (320, 640, 960, 1280, 1920))):
+        widths.append(width)
+        if image.width and width >= image.width:
+            break
+    return widths
+
+
+def rendition_formats():
+    """BLOG_RENDITION_FORMATS that this Pillow build can write, e.g. avif needs Pillow 11.3+ or pillow-avif-plugin"""
+    PILImage.init()
+    return [
+        output_format for output_format in getattr(settings, 'BLOG_RENDITION_FORMATS', ('webp',))
+        if output_format.upper() in PILImage.SAVE
+    ]
+
+
+def rendition_specs(image):
+    """
+    {format: [filter spec per width]}; None is the image's own format, what <img> falls back to.
+    These are the only renditions page templates ask for (see blogs.templatetags.blog_images).
+    """
+    widths = rendition_widths(image)
+    specs = {None: ['width-%d' % width for width in widths]}
+    for output_format in rendition_formats():
+        specs[output_format] = ['width-%d|format-%s' % (width, output_format) for width in widths]
+    return specs
+
+
+def find_renditions(image):
+    """
+    ({format: [rendition, ...]}, number missing) for the declared variants of an image that
+    already exist. Free when the image's renditions were prefetched (as for_listing does),
+    one query otherwise. Never resizes.
+    """
+    specs = rendition_specs(image)
+    filters = {spec: Filter(spec) for format_specs in specs.values() for spec in format_specs}
+    found = image.find_existing_renditions(*filters.values())
+    renditions = {
+        output_format: [found[filters[spec]] for spec in format_specs if filters[spec] in found]
+        for output_format, format_specs in specs.items()
+    }
+    return renditions, len(filters) - len(found)
+
+
+def generate_renditions(image_id):
+    """Create whichever declared variants of an image are missing; returns how many there are"""
+    image = get_image_model().objects.filter(pk=image_id).first()
+    if image is None:
+        return 0
+    specs = [spec for format_specs in rendition_specs(image).values() for spec in format_specs]
+    return len(image.get_renditions(*specs))
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BLOG_RENDITION_WORKERS', 2),
+                thread_name_prefix='renditions',
+            )
+    return _executor
+
+
+def run_generation(image_id):
+    """generate_renditions for the worker threads, which have their own db connection to tidy up"""
+    try:
+        generate_renditions(image_id)
+    except Exception:
+        logger.exception("Generating renditions of image %s failed", image_id)
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(image_id)
+        connection.close()
+
+
+def submit(image_ids):
+    with _in_flight_lock:
+        image_ids = [image_id for image_id in image_ids if image_id not in _in_flight]
+        _in_flight.update(image_ids)
+    for image_id in image_ids:
+        get_executor().submit(run_generation, image_id)
+
+
+def queue_renditions(image_ids, inline=True):
+    """
+    Generate the declared variants of some images in the worker pool once the transaction
+    commits. BLOG_RENDITION_WORKERS = 0 generates them inline instead, unless inline is
+    False (a page being rendered), in which case nothing happens.
+    """
+    image_ids = {image_id for image_id in image_ids if image_id}
+    if not image_ids:
+        return
+
+    if not getattr(settings, 'BLOG_RENDITION_WORKERS', 2):
+        if inline:
+            transaction.on_commit(lambda: [generate_renditions(image_id) for image_id in sorted(image_ids)])
+        return
+
+    transaction.on_commit(lambda: submit(sorted(image_ids)))
+
+
+def page_image_ids(page):
+    """Every image a BlogPage or AuthorPage shows"""
+    from blogs.models import AuthorPage, BlogPage
+
+    page = page.specific
+    if isinstance(page, BlogPage):
+        image_ids = [page.image_id] + list(stream_image_ids([page.body]))
+        image_ids += page.gallery_images.values_list('image_id', flat=True)
+    elif isinstance(page, AuthorPage):
+        image_ids = [page.profile_picture_id] + list(stream_image_ids([page.bio]))
+    else:
+        image_ids = []
+    return image_ids
@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from blogs.utils.cache import namespace_key
+from blogs.utils.paginate import paginate_item
+
+
+# The tag directory and every posting list; bumped on publish/unpublish and tag edits
+TAG_NAMESPACE = 'blog-tags'
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+
+def build_tag_index():
+    """
+    Materialize the tag index from one query over the tagged live, public posts:
+    the directory {'tags': {id: (slug, name)}, 'slugs': {slug: id}, 'names': {casefolded name: id},
+    'order': [post id, ...]} and a posting list per tag, post ids newest first.
+    Everything goes into the cache in one set_many; returns (directory, {tag id: posting list}).
+    """
+    from blogs.models import BlogPage, BlogPageTag
+
+    rows = (
+        BlogPageTag.objects
+        .filter(content_object__in=BlogPage.objects.live().public())
+        .order_by('-content_object__first_published_at', '-content_object_id')
+        .values_list('tag_id', 'tag__slug', 'tag__name', 'content_object_id')
+    )
+
+    tags = {}
+    postings = {}
+    order = []
+    for tag_id, slug, name, post_id in rows:
+        tags[tag_id] = (slug, name)
+        posting = postings.setdefault(tag_id, [])
+        # Rows come grouped by post, so a post tagged twice repeats back to back
+        if not posting or posting[-1] != post_id:
+            posting.append(post_id)
+        if not order or order[-1] != post_id:
+            order.append(post_id)
+
+    directory = {
+        'tags': tags,
+        'slugs': {slug: tag_id for tag_id, (slug, name) in tags.items()},
+        'names': {name.casefold(): tag_id for tag_id, (slug, name) in tags.items()},
+        'order': order,
+    }
+    timeout = getattr(settings, 'BLOG_TAG_CACHE_TIMEOUT', 60 * 60)
+    values = {namespace_key(TAG_NAMESPACE, {'tag': tag_id}): posting for tag_id, posting in postings.items()}
+    values[namespace_key(TAG_NAMESPACE, {'list': 'directory'})] = directory
+    cache.set_many(values, timeout)
+    return directory, postings
+
+
+def tag_directory():
+    directory = cache.get(namespace_key(TAG_NAMESPACE, {'list': 'directory'}))
+    if directory is None:
+        directory, postings = build_tag_index()
+    return directory
+
+
+def posting_lists(tag_ids):
+    """{tag id: post ids newest first} for some tags, from the cache or a rebuild of the index"""
+    keys = {namespace_key(TAG_NAMESPACE, {'tag': tag_id}): tag_id for tag_id in tag_ids}
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        directory, postings = build_tag_index()
+        return {tag_id: postings.get(tag_id, []) for tag_id in tag_ids}
+    return {keys[key]: posting for key, posting in found.items()}
+
+
+def resolve_tags(values):
+    """
+    [(id, slug, name)] for ?tag= values, which may be slugs or (for older links) names.
+    Unknown tags are dropped, repeats collapsed.
+    """
+    directory = tag_directory()
+    resolved = []
+    for value in values:
+        tag_id = directory['slugs'].get(value)
+        if tag_id is None:
+            tag_id = directory['names'].get(value.strip().casefold())
+        if tag_id is not None and tag_id not in [tag[0] for tag in resolved]:
+            resolved.append((tag_id,) + directory['tags'][tag_id])
+    return resolved
+
+
+def tagged_post_ids(tag_ids, match=MATCH_ALL):
+    """
+    Ids of the live, public posts carrying all (MATCH_ALL) or any (MATCH_ANY) of some tags,
+    newest first, without touching the db once the index is cached
+    """
+    if not tag_ids:
+        return []
+
+    postings = posting_lists(tag_ids)
+    if len(tag_ids) == 1:
+        return postings[tag_ids[0]]
+
+    if match == MATCH_ANY:
+        rank = {post_id: position for position, post_id in enumerate(tag_directory()['order'])}
+        # A posting list rebuilt after the directory may hold posts it doesn't know yet, the newest
+        return sorted(set().union(*postings.values()), key=lambda post_id: (rank.get(post_id, -1), -post_id))
+
+    # Walk the shortest list, it is already in order
+    shortest, *others = sorted(postings.values(), key=len)
+    others = [set(posting) for posting in others]
+    return [post_id for post_id in shortest if all(post_id in posting for posting in others)]
+
+
+def tag_cloud(order_by='name'):
+    """Every tag on a live post as {'slug', 'name', 'count'}, by name or (order_by='count') most used first"""
+    directory = tag_directory()
+    counts = {tag_id: len(posting) for tag_id, posting in posting_lists(list(directory['tags'])).items()}
+    cloud = [
+        {'slug': slug, 'name': name, 'count': counts[tag_id]}
+        for tag_id, (slug, name) in directory['tags'].items()
+    ]
+    if order_by == 'count':
+        cloud.sort(key=lambda tag: (-tag['count'], tag['name'].casefold()))
+    else:
+        cloud.sort(key=lambda tag: tag['name'].casefold())
+    return cloud
+
+
+def tag_listing(request, num=9):
+    """
+    Return (tags, match, page of posts) for ?tag=a&tag=b&match=any|all (all by default).
+    Pagination runs over the posting lists, so only the posts on the page are fetched.
+    """
+    from blogs.models import BlogPage
+
+    tags = resolve_tags(request.GET.getlist('tag'))
+    match = MATCH_ANY if request.GET.get('match') == MATCH_ANY else MATCH_ALL
+    page = paginate_item(request, tagged_post_ids([tag[0] for tag in tags], match), num)
+
+    posts = BlogPage.objects.filter(pk__in=list(page.object_list)).for_listing().in_bulk()
+    page.object_list = [posts[pk] for pk in page.object_list if pk in posts]
+    return tags, match, page
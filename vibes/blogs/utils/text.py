@@ -0,0 +1,78 @@
+import html
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from wagtail.blocks import StreamValue, StructValue
+from wagtail.rich_text import RichText
+
+
+def block_text(value):
+    """The readable text in a block value (headings, rich text, captions), as a list of strings"""
+    parts = []
+
+    def walk(value):
+        if isinstance(value, RichText):
+            parts.append(html.unescape(strip_tags(value.source)))
+        elif isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, StreamValue):
+            for child in value:
+                walk(child.value)
+        elif isinstance(value, StructValue):
+            for child in value.values():
+                walk(child)
+        elif isinstance(value, (list, tuple)):
+            for child in value:
+                walk(child)
+
+    walk(value)
+    return [part.strip() for part in parts if part and part.strip()]
+
+
+def stream_text(value):
+    """The readable text in a StreamField value, as one string"""
+    return '\n'.join(block_text(value))
+
+
+def text_stats(body):
+    """
+    (excerpt, word count, reading time in minutes) for a post body. The excerpt is the
+    start of the first paragraph block, BLOG_EXCERPT_WORDS words at most.
+    """
+    paragraph = next((block.value for block in body if block.block_type == 'paragraph'), None)
+    excerpt = ' '.join(' '.join(block_text(paragraph)).split()) if paragraph is not None else ''
+    excerpt = Truncator(excerpt).words(getattr(settings, 'BLOG_EXCERPT_WORDS', 40))
+
+    words = len(stream_text(body).split())
+    reading_time = math.ceil(words / getattr(settings, 'BLOG_WORDS_PER_MINUTE', 200))
+    return excerpt, words, reading_time
+
+
+def backfill_text_stats(post_model, chunk_size=200, recompute=False, log=None):
+    """
+    Fill in the stored excerpt / word count / reading time of BlogPages (those without a
+    word count unless recompute), chunk_size posts per read and UPDATE, straight to the
+    table (no save(), no revisions). Takes the model so migrations can pass their
+    historical one. Returns the number of posts.
+    """
+    posts = post_model.objects.order_by('pk')
+    if not recompute:
+        posts = posts.filter(word_count=0)
+    post_ids = list(posts.values_list('pk', flat=True))
+
+    for start in range(0, len(post_ids), chunk_size):
+        chunk = post_model.objects.filter(pk__in=post_ids[start:start + chunk_size]).only('id', 'body')
+        updated = []
+        for post in chunk:
+            post.excerpt, post.word_count, post.reading_time = text_stats(post.body)
+            updated.append(post)
+
+        with transaction.atomic():
+            post_model.objects.bulk_update(updated, ['excerpt', 'word_count', 'reading_time'])
+        if log:
+            log("%s / %s" % (min(start + chunk_size, len(post_ids)), len(post_ids)))
+    return len(post_ids)
@@ -1,3 +1,26 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import JsonResponse
 
-# Create your views here.
+from blogs.utils.authors import author_directory as find_authors
+
+
+def author_directory(request):
+    """A page of authors (?page=x), optionally those writing in ?language= and/or based in ?location=, as JSON"""
+    filters, authors = find_authors(request, getattr(settings, 'BLOG_AUTHORS_PER_PAGE', 20))
+
+    return JsonResponse({
+        'filters': filters,
+        'authors': [
+            {
+                'name': author.title,
+                'url': author.url,
+                'location': author.author_location.name if author.author_location else None,
+                'languages': [language.name for language in author.author_languages.all()],
+            }
+            for author in authors
+        ],
+        'page': authors.number,
+        'num_pages': authors.paginator.num_pages,
+        'has_next': authors.has_next(),
+        'count': authors.paginator.count,
+    })
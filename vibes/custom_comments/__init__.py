@@ -6,3 +6,14 @@ def get_model():
 def get_form():
     from .forms import CommentForm
     return CommentForm
+
+def get_comment_thread(target):
+    """Public comments on target, oldest first, fetching only what the thread shows"""
+    from django.contrib.contenttypes.models import ContentType
+    return get_model().objects.filter(
+        # content_type + object_pk together, so the thread index can be used
+        content_type=ContentType.objects.get_for_model(target),
+        object_pk=str(target.pk),
+        is_public=True,
+        is_removed=False,
+    ).only('id', 'user_name', 'comment', 'submit_date').order_by('submit_date', 'id')
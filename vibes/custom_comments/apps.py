@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CustomCommentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'custom_comments'
+
+    def ready(self):
+        # Keep the per-page comment counters in step with comment saves
+        from custom_comments import signals  # noqa: F401
@@ -0,0 +1,151 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateTimeField, F, Max, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from wagtail.models import Page
+
+from custom_comments import get_model
+from custom_comments.models import CommentStats
+
+
+def is_counted(comment):
+    """Only comments visitors can see are counted"""
+    return comment.is_public and not comment.is_removed
+
+
+def page_id_for(comment):
+    """The id of the Page a comment was posted on, or None for comments on anything else"""
+    model = ContentType.objects.get_for_id(comment.content_type_id).model_class()
+    if model is None or not issubclass(model, Page):
+        return None
+    try:
+        return int(comment.object_pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def newest_comment_date(content_type_id, page_id):
+    """Subquery for the submit_date of the newest counted comment on a page"""
+    return Subquery(
+        get_model().objects.filter(
+            content_type_id=content_type_id,
+            object_pk=str(page_id),
+            is_public=True,
+            is_removed=False,
+        ).order_by('-submit_date').values('submit_date')[:1]
+    )
+
+
+def add_comment(page_id, submit_date):
+    """Count one more comment on a page, in a single UPDATE"""
+    submit_date = Value(submit_date, output_field=DateTimeField())
+    updated = CommentStats.objects.filter(page_id=page_id).update(
+        comment_count=F('comment_count') + 1,
+        last_comment_at=Greatest(Coalesce('last_comment_at', submit_date), submit_date),
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            CommentStats.objects.create(page_id=page_id, comment_count=1, last_comment_at=submit_date.value)
+    except IntegrityError:
+        # Another request created the row first, count on top of theirs
+        add_comment(page_id, submit_date.value)
+
+
+def remove_comment(page_id, content_type_id, submit_date):
+    """Count one comment less on a page; call after the comment is hidden or deleted"""
+    CommentStats.objects.filter(page_id=page_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1,
+    )
+    # If it was the newest one, the next newest takes over
+    CommentStats.objects.filter(page_id=page_id, last_comment_at__lte=submit_date).update(
+        last_comment_at=newest_comment_date(content_type_id, page_id),
+    )
+
+
+def recount_page(page_id, content_type_id):
+    """Recount a page from scratch, for when we can't tell what changed"""
+    stats = get_model().objects.filter(
+        content_type_id=content_type_id,
+        object_pk=str(page_id),
+        is_public=True,
+        is_removed=False,
+    ).aggregate(count=Count('pk'), last=Max('submit_date'))
+
+    CommentStats.objects.update_or_create(
+        page_id=page_id,
+        defaults={'comment_count': stats['count'], 'last_comment_at': stats['last']},
+    )
+
+
+def page_content_types():
+    """Ids of the content types of every Page model"""
+    return [
+        content_type.pk for content_type in ContentType.objects.all()
+        if content_type.model_class() is not None and issubclass(content_type.model_class(), Page)
+    ]
+
+
+def page_totals(comments):
+    """{page id: (count, newest submit_date)} for the counted comments in a queryset, in one grouped query"""
+    rows = (
+        comments
+        .filter(content_type__in=page_content_types(), is_public=True, is_removed=False)
+        .values('object_pk')
+        .annotate(count=Count('pk'), last=Max('submit_date'))
+        .order_by()
+    )
+
+    totals = {}
+    for row in rows:
+        try:
+            page_id = int(row['object_pk'])
+        except ValueError:
+            continue
+        count, last = totals.get(page_id, (0, None))
+        totals[page_id] = (count + row['count'], max(filter(None, (last, row['last']))))
+    return totals
+
+
+def recount_pages(page_ids):
+    """Recount several pages at once, e.g. after a bulk moderation UPDATE"""
+    page_ids = set(page_ids)
+    if not page_ids:
+        return
+
+    totals = page_totals(get_model().objects.filter(object_pk__in=[str(page_id) for page_id in page_ids]))
+    stats = CommentStats.objects.in_bulk(page_ids)
+    existing = set(Page.objects.filter(pk__in=page_ids - set(stats)).values_list('pk', flat=True))
+
+    for page_id, row in stats.items():
+        row.comment_count, row.last_comment_at = totals.get(page_id, (0, None))
+    CommentStats.objects.bulk_update(stats.values(), ['comment_count', 'last_comment_at'])
+    CommentStats.objects.bulk_create(
+        [
+            CommentStats(page_id=page_id, comment_count=count, last_comment_at=last)
+            for page_id, (count, last) in totals.items() if page_id in existing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_comment_stats(batch_size=1000):
+    """Throw the counters away and rebuild them all with one aggregate query; returns the row count"""
+    totals = page_totals(get_model().objects.all())
+
+    # Comments can outlive their page
+    existing = set(Page.objects.filter(pk__in=list(totals)).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        CommentStats.objects.all().delete()
+        CommentStats.objects.bulk_create(
+            [
+                CommentStats(page_id=page_id, comment_count=count, last_comment_at=last)
+                for page_id, (count, last) in totals.items() if page_id in existing
+            ],
+            batch_size=batch_size,
+        )
+    return len(existing)
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+
+import cachetools
+import dns.resolver
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class MXCache(object):
+    """
+    MX lookups for comment email domains.
+
+    Answers are kept for as long as their DNS TTL says (clamped to min_ttl..max_ttl),
+    NXDOMAIN / no-answer results for negative_ttl, so a burst of comments from a
+    throwaway domain costs one lookup. Entries live in a lock-protected per-process
+    TLRU cache and, with shared=True, in the django cache (Redis) for the other workers.
+    Concurrent misses for the same domain wait on a single lookup.
+    Timeouts and resolver failures are not cached.
+    """
+
+    key_prefix = 'mx-records:'
+
+    def __init__(self, maxsize=1000, negative_ttl=300, min_ttl=60, max_ttl=60 * 60 * 24, shared=True,
+                 timer=time.monotonic):
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.shared = shared
+        # Entries are (records, ttl); each one expires after its own ttl
+        self.local = cachetools.TLRUCache(maxsize=maxsize, ttu=lambda key, value, now: now + value[1], timer=timer)
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.counters = {
+            'local_hits': 0,
+            'shared_hits': 0,
+            'misses': 0,
+            'negative_answers': 0,
+            'lookup_seconds': 0.0,
+            'slowest_lookup': 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            maxsize=getattr(settings, 'COMMENT_DNS_CACHE_SIZE', 1000),
+            negative_ttl=getattr(settings, 'COMMENT_DNS_NEGATIVE_TTL', 300),
+            min_ttl=getattr(settings, 'COMMENT_DNS_MIN_TTL', 60),
+            max_ttl=getattr(settings, 'COMMENT_DNS_MAX_TTL', 60 * 60 * 24),
+            shared=getattr(settings, 'COMMENT_DNS_CACHE_SHARED', True),
+        )
+
+    def lookup(self, domain, lifetime=None):
+        """Sorted MX hostnames for domain, or None if it has none"""
+        domain = domain.lower().rstrip('.')
+
+        records = self.cached(domain)
+        if records is not False:
+            return records
+
+        with self.lock:
+            domain_lock = self.inflight.setdefault(domain, threading.Lock())
+
+        with domain_lock:
+            # Whoever held the lock before us may have just looked it up
+            records = self.cached(domain, count=False)
+            if records is not False:
+                return records
+
+            try:
+                records, ttl = self.resolve(domain, lifetime)
+                self.store(domain, records, ttl)
+            finally:
+                with self.lock:
+                    self.inflight.pop(domain, None)
+
+        return records
+
+    def cached(self, domain, count=True):
+        """Cached records (None for a cached negative), or False on a miss"""
+        with self.lock:
+            entry = self.local.get(domain)
+        if entry is not None:
+            if count:
+                self.count('local_hits')
+            return entry[0]
+
+        if self.shared:
+            entry = cache.get(self.key_prefix + domain)
+            if entry is not None:
+                records, expires_at = entry
+                ttl = expires_at - time.time()
+                if ttl > 0:
+                    with self.lock:
+                        self.local[domain] = (records, ttl)
+                    if count:
+                        self.count('shared_hits')
+                    return records
+
+        return False
+
+    def resolve(self, domain, lifetime=None):
+        self.count('misses')
+        started = time.monotonic()
+        try:
+            answers = dns.resolver.resolve(domain, 'MX', lifetime=lifetime)
+            records = sorted(str(answer.exchange) for answer in answers)
+            ttl = min(max(answers.rrset.ttl, self.min_ttl), self.max_ttl)
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+            self.count('negative_answers')
+            records, ttl = None, self.negative_ttl
+        finally:
+            elapsed = time.monotonic() - started
+            with self.lock:
+                self.counters['lookup_seconds'] += elapsed
+                self.counters['slowest_lookup'] = max(self.counters['slowest_lookup'], elapsed)
+            logger.debug("MX lookup for %s took %.3fs", domain, elapsed)
+
+        return records, ttl
+
+    def store(self, domain, records, ttl):
+        with self.lock:
+            self.local[domain] = (records, ttl)
+        if self.shared:
+            cache.set(self.key_prefix + domain, (records, time.time() + ttl), ttl)
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        """Hit/miss counts and lookup latency for this process"""
+        with self.lock:
+            stats = dict(self.counters)
+            stats['size'] = len(self.local)
+        stats['average_lookup'] = stats['lookup_seconds'] / stats['misses'] if stats['misses'] else 0.0
+        return stats
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
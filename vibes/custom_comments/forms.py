@@ -1,5 +1,3 @@
-import dns.resolver
-import cachetools
 import email_validator
 from email_validator import validate_email, EmailNotValidError
 
@@ -8,47 +6,20 @@ from django.conf import settings
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django_comments.forms import CommentForm
 
+from custom_comments.dns_cache import MXCache
+
 email_validator.TEST_ENVIRONMENT=settings.EMAIL_VALIDATOR_TEST_ENV
 username_validator = UnicodeUsernameValidator()
 
-# Create an LRU cache with a maximum size of 100 entries
-dns_cache = cachetools.LRUCache(maxsize=200)
-
-# Custom DNS resolver function that uses the LRU cache
-def cached_dns_resolver(domain):
-    try:
-        # Check if the domain's MX records are cached
-        if domain in dns_cache:
-            return dns_cache[domain]
-        else:
-            # Perform DNS query and cache the result in the LRU cache
-            answers = dns.resolver.resolve(domain, 'MX')
-            dns_cache[domain] = answers
-            return answers
-    except dns.resolver.NoAnswer:
-        return None
-    except dns.resolver.NXDOMAIN:
-        return None
-
-# Function to validate email address and check DNS with LRU cache
-def validate_email_with_lru_cache(email):
-    try:
-        # Validate the email's syntax and domain
-        valid = validate_email(email)
-
-        # Extract the domain from the validated email
-        domain = valid.email.split('@')[1]
-
-        # Perform DNS lookup with LRU cache
-        mx_records = cached_dns_resolver(domain)
-        if mx_records:
-            return valid.normalized, "Valid email with MX records"
-        else:
-            return valid.normalized, "Valid email, but no MX records found"
-
-    except EmailNotValidError as e:
-        # Email not valid
-        return None, str(e)
+# Shared, TTL-aware cache of MX lookups (see custom_comments.dns_cache)
+dns_cache = MXCache.from_settings()
+
+# Custom DNS resolver function that uses the cache
+def cached_dns_resolver(domain, lifetime=None):
+    # Sorted MX hostnames, or None when the domain has none (NXDOMAIN / no answer)
+    # lifetime caps the whole lookup, in seconds
+    return dns_cache.lookup(domain, lifetime=lifetime)
+
 
 
 class CommentForm(CommentForm):
@@ -64,14 +35,16 @@ class CommentForm(CommentForm):
     def clean_email(self):
         email = self.cleaned_data['email']
 
-        # Validate the email address and check DNS records with LRUCache
-        validated_email, message = validate_email_with_lru_cache(email)
-
-        if not validated_email:
-            raise forms.ValidationError(f"Invalid email: {message}")
+        # Only the syntax is checked here, so a slow resolver can't hold up the request.
+        # The MX lookup runs in the background once the comment is saved
+        # (see custom_comments.verification)
+        try:
+            validated = validate_email(email, check_deliverability=False)
+        except EmailNotValidError as e:
+            raise forms.ValidationError(f"Invalid email: {e}")
 
         # Return the validated email if everything is correct
-        return validated_email
+        return validated.normalized
 
 
     # Site ID should be sent from tbe form?
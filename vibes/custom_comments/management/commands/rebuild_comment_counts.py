@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from custom_comments.counters import rebuild_comment_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-page comment_count / last_comment_at counters from the comments table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT")
+
+    def handle(self, *args, **options):
+        pages = rebuild_comment_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS("Rebuilt comment counters for %s pages" % pages))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from custom_comments.verification import retry_stale_verifications
+
+
+class Command(BaseCommand):
+    help = "Check the email domains of comments left pending verification, e.g. by a worker that died"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=None,
+            help="Only comments pending for at least this many seconds (default COMMENT_MX_RETRY_AFTER)",
+        )
+
+    def handle(self, *args, **options):
+        checked = retry_stale_verifications(older_than=options['older_than'])
+        self.stdout.write(self.style.SUCCESS("Checked %s pending comments" % checked))
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index the public thread of an object, in display order, for get_comment_thread().
+    django_comments' model isn't ours, so the index is plain SQL.
+    """
+
+    dependencies = [
+        ('django_comments', '0004_add_object_pk_is_removed_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX django_comments_thread_idx "
+            "ON django_comments (content_type_id, object_pk, submit_date, id) "
+            "WHERE is_public AND NOT is_removed",
+            "DROP INDEX django_comments_thread_idx",
+        ),
+    ]
@@ -0,0 +1,23 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_comments', '0004_add_object_pk_is_removed_index'),
+        ('custom_comments', '0002_commentstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentVerification',
+            fields=[
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='verification', serialize=False, to='django_comments.comment')),
+                ('status', models.CharField(choices=[('pending_verification', 'Pending verification'), ('verified', 'Verified'), ('flagged', 'Flagged')], db_index=True, default='pending_verification', max_length=32)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('checked_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
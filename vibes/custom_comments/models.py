@@ -1,3 +1,52 @@
 from django.db import models
 
-# Create your models here.
+
+class CommentStats(models.Model):
+    """
+    Denormalized comment totals for a page, so listings and post headers don't
+    have to count django_comments rows. Only public, non-removed comments count.
+    Kept up to date by custom_comments.signals; rebuild with rebuild_comment_counts.
+    """
+    page = models.OneToOneField(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='comment_stats'
+    )
+    comment_count = models.PositiveIntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "%s comments on page %s" % (self.comment_count, self.page_id)
+
+    class Meta:
+        verbose_name_plural = 'comment stats'
+
+
+class CommentVerification(models.Model):
+    """
+    Where a comment is in the background email (MX) check. Comments are saved hidden
+    as pending_verification, then published or flagged for a moderator by the worker.
+    """
+    PENDING = 'pending_verification'
+    VERIFIED = 'verified'
+    FLAGGED = 'flagged'
+    STATUS_CHOICES = [
+        (PENDING, "Pending verification"),
+        (VERIFIED, "Verified"),
+        (FLAGGED, "Flagged"),
+    ]
+
+    comment = models.OneToOneField(
+        'django_comments.Comment',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='verification'
+    )
+    status = models.CharField(max_length=32, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return "%s: %s" % (self.comment_id, self.status)
@@ -0,0 +1,70 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from wagtail.models import Page
+
+from blogs.utils.pagecache import purge_page_cache
+from custom_comments import get_model
+from custom_comments.counters import recount_pages
+from custom_comments.models import CommentVerification
+
+
+APPROVE = 'approve'
+REMOVE = 'remove'
+SPAM = 'spam'
+
+# The flags each action sets, applied to the whole selection in one UPDATE
+ACTIONS = {
+    APPROVE: {'is_public': True, 'is_removed': False},
+    REMOVE: {'is_removed': True},
+    SPAM: {'is_public': False, 'is_removed': True},
+}
+
+
+def affected_pages(comments):
+    """Ids of the Pages a queryset of comments was posted on"""
+    page_ids = set()
+    for content_type_id, object_pk in comments.values_list('content_type_id', 'object_pk').distinct():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None or not issubclass(model, Page):
+            continue
+        try:
+            page_ids.add(int(object_pk))
+        except (TypeError, ValueError):
+            continue
+    return page_ids
+
+
+def moderate_comments(comment_ids, action):
+    """
+    Approve, remove or mark as spam a batch of comments with a single UPDATE, then
+    recount and purge the pages they were posted on. Returns the number of comments changed.
+
+    queryset.update() skips the save signals, so the counters are fixed up here
+    (one grouped recount for all affected pages) rather than comment by comment.
+    """
+    comments = get_model().objects.filter(pk__in=list(comment_ids))
+    page_ids = affected_pages(comments)
+
+    with transaction.atomic():
+        updated = comments.update(**ACTIONS[action])
+
+        if action == SPAM:
+            CommentVerification.objects.filter(comment__in=comments).update(
+                status=CommentVerification.FLAGGED,
+                reason="Marked as spam by a moderator",
+                checked_at=timezone.now(),
+            )
+        elif action == APPROVE:
+            # Nothing left for the MX worker to decide
+            CommentVerification.objects.filter(
+                comment__in=comments, status=CommentVerification.PENDING,
+            ).update(status=CommentVerification.VERIFIED, checked_at=timezone.now())
+
+        recount_pages(page_ids)
+
+    for page in Page.objects.filter(pk__in=page_ids):
+        purge_page_cache(page)
+
+    return updated
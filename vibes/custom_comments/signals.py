@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from wagtail.models import Page
+
+from blogs.utils.pagecache import purge_page_cache
+from custom_comments import get_model
+from custom_comments.counters import add_comment, is_counted, page_id_for, recount_page, remove_comment
+
+
+Comment = get_model()
+
+
+def comment_changed(page_id):
+    # Counts and threads show up on the post and on the listings around it
+    page = Page.objects.filter(pk=page_id).first()
+    if page is not None:
+        purge_page_cache(page)
+
+
+@receiver(post_init, sender=Comment)
+def remember_counted(sender, instance, **kwargs):
+    """Note whether a comment was counted when it was loaded, to spot moderation flips on save"""
+    if instance.pk is None:
+        instance._was_counted = False
+    elif {'is_public', 'is_removed'} & instance.get_deferred_fields():
+        # Loaded without the flags (e.g. for a thread); recount if it is ever saved
+        instance._was_counted = None
+    else:
+        instance._was_counted = is_counted(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, raw=False, **kwargs):
+    # Fixtures are left to the rebuild_comment_counts command
+    if raw:
+        return
+    page_id = page_id_for(instance)
+    if page_id is None:
+        return
+
+    was_counted = getattr(instance, '_was_counted', None)
+    counted = is_counted(instance)
+    if was_counted is None:
+        recount_page(page_id, instance.content_type_id)
+    elif counted and not was_counted:
+        add_comment(page_id, instance.submit_date)
+    elif was_counted and not counted:
+        remove_comment(page_id, instance.content_type_id, instance.submit_date)
+    else:
+        return
+
+    instance._was_counted = counted
+    comment_changed(page_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    page_id = page_id_for(instance)
+    if page_id is None:
+        return
+
+    was_counted = getattr(instance, '_was_counted', None)
+    if was_counted is None:
+        recount_page(page_id, instance.content_type_id)
+    elif was_counted:
+        remove_comment(page_id, instance.content_type_id, instance.submit_date)
+    else:
+        return
+
+    comment_changed(page_id)
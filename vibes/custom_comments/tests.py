@@ -1,3 +1,346 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import dns.exception
+import dns.resolver
+
+from wagtail.models import Page
+
+from blogs.models import BlogIndexPage, BlogPage
+
+from custom_comments import get_form, get_model
+from custom_comments.counters import rebuild_comment_stats
+from custom_comments.dns_cache import MXCache
+from custom_comments import throttle
+from custom_comments.models import CommentStats, CommentVerification
+from custom_comments.throttle import TokenBucketLimiter
+from custom_comments.verification import retry_stale_verifications, verify_comment
+
+
+class CommentCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(depth=1)
+        self.page = root.add_child(instance=Page(title="Post", slug="post"))
+        self.now = timezone.now()
+
+    def add_comment(self, minutes_ago=0, **kwargs):
+        return get_model().objects.create(
+            content_type=ContentType.objects.get_for_model(Page),
+            object_pk=str(self.page.pk),
+            site_id=1,
+            user_name="reader",
+            user_email="reader@example.com",
+            comment="Nice post",
+            submit_date=self.now - datetime.timedelta(minutes=minutes_ago),
+            **kwargs
+        )
+
+    def stats(self):
+        return CommentStats.objects.get(page_id=self.page.pk)
+
+    def test_public_comments_are_counted(self):
+        self.add_comment(minutes_ago=5)
+        newest = self.add_comment()
+        self.add_comment(is_public=False)
+
+        stats = self.stats()
+        self.assertEqual(stats.comment_count, 2)
+        self.assertEqual(stats.last_comment_at, newest.submit_date)
+
+    def test_hiding_the_newest_comment_moves_last_comment_back(self):
+        older = self.add_comment(minutes_ago=5)
+        newest = self.add_comment()
+
+        newest.is_removed = True
+        newest.save()
+
+        stats = self.stats()
+        self.assertEqual(stats.comment_count, 1)
+        self.assertEqual(stats.last_comment_at, older.submit_date)
+
+    def test_publishing_a_hidden_comment_counts_it(self):
+        comment = self.add_comment(is_public=False)
+        self.assertFalse(CommentStats.objects.filter(page_id=self.page.pk).exists())
+
+        comment.is_public = True
+        comment.save()
+        self.assertEqual(self.stats().comment_count, 1)
+
+    def test_deleting_comments_uncounts_them(self):
+        self.add_comment(minutes_ago=5)
+        newest = self.add_comment()
+
+        newest.delete()
+        self.assertEqual(self.stats().comment_count, 1)
+
+        # Loaded without its flags, so the page is recounted
+        get_model().objects.only('pk', 'content_type_id', 'object_pk', 'submit_date').get().delete()
+        stats = self.stats()
+        self.assertEqual(stats.comment_count, 0)
+        self.assertIsNone(stats.last_comment_at)
+
+    def test_rebuild_matches_the_signals(self):
+        self.add_comment(minutes_ago=5)
+        newest = self.add_comment()
+        self.add_comment(is_removed=True)
+        CommentStats.objects.all().delete()
+
+        self.assertEqual(rebuild_comment_stats(), 1)
+        stats = self.stats()
+        self.assertEqual(stats.comment_count, 2)
+        self.assertEqual(stats.last_comment_at, newest.submit_date)
+
+
+def broken_resolver(domain, timeout):
+    raise RuntimeError("resolver is down")
+
+
+@override_settings(COMMENT_MX_RESOLVER='custom_comments.verification.StubMXResolver')
+class CommentVerificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(depth=1)
+        self.page = root.add_child(instance=Page(title="Post", slug="post"))
+
+    def add_pending(self, email="reader@example.com"):
+        comment = get_model().objects.create(
+            content_type=ContentType.objects.get_for_model(Page),
+            object_pk=str(self.page.pk),
+            site_id=1,
+            user_name="reader",
+            user_email=email,
+            comment="Nice post",
+            submit_date=timezone.now(),
+            is_public=False,
+        )
+        CommentVerification.objects.create(comment=comment)
+        return comment
+
+    def status(self, comment):
+        return CommentVerification.objects.get(comment=comment).status
+
+    def test_resolver_class_is_instantiated(self):
+        published = self.add_pending()
+        flagged = self.add_pending(email="reader@nowhere.invalid")
+
+        verify_comment(published.pk)
+        verify_comment(flagged.pk)
+
+        self.assertEqual(self.status(published), CommentVerification.VERIFIED)
+        self.assertTrue(get_model().objects.get(pk=published.pk).is_public)
+        self.assertEqual(self.status(flagged), CommentVerification.FLAGGED)
+        self.assertFalse(get_model().objects.get(pk=flagged.pk).is_public)
+
+    @override_settings(COMMENT_MX_RESOLVER='custom_comments.tests.broken_resolver')
+    def test_unexpected_errors_flag_the_comment(self):
+        comment = self.add_pending()
+        with self.assertLogs('custom_comments.verification', 'ERROR'):
+            verify_comment(comment.pk)
+
+        verification = CommentVerification.objects.get(comment=comment)
+        self.assertEqual(verification.status, CommentVerification.FLAGGED)
+        self.assertIn("resolver is down", verification.reason)
+
+    def test_stale_pending_comments_are_retried(self):
+        stale = self.add_pending()
+        CommentVerification.objects.filter(comment=stale).update(
+            created_at=timezone.now() - datetime.timedelta(hours=1),
+        )
+        fresh = self.add_pending()
+
+        self.assertEqual(retry_stale_verifications(older_than=60), 1)
+        self.assertEqual(self.status(stale), CommentVerification.VERIFIED)
+        self.assertEqual(self.status(fresh), CommentVerification.PENDING)
+
+
+class MXAnswer(object):
+    """What dns.resolver.resolve returns for an MX query, as far as MXCache looks"""
+
+    def __init__(self, ttl, *exchanges):
+        self.rrset = mock.Mock(ttl=ttl)
+        self.answers = [mock.Mock(exchange=exchange) for exchange in exchanges]
+
+    def __iter__(self):
+        return iter(self.answers)
+
+
+class MXCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.answers = {}
+
+    def make_cache(self, shared=False):
+        return MXCache(negative_ttl=300, min_ttl=60, max_ttl=3600, shared=shared, timer=lambda: self.now)
+
+    def resolve(self, domain, rdtype, lifetime=None):
+        answer = self.answers[domain]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def lookup(self, mx_cache, domain):
+        with mock.patch('custom_comments.dns_cache.dns.resolver.resolve', side_effect=self.resolve) as resolve, \
+                mock.patch('custom_comments.dns_cache.time.time', return_value=self.now):
+            records = mx_cache.lookup(domain)
+        return records, resolve.call_count
+
+    def test_answers_are_kept_for_their_ttl(self):
+        mx_cache = self.make_cache()
+        self.answers['example.com'] = MXAnswer(120, 'mx2.example.com.', 'mx1.example.com.')
+
+        self.assertEqual(self.lookup(mx_cache, 'Example.com.'), (['mx1.example.com.', 'mx2.example.com.'], 1))
+        self.now += 119
+        self.assertEqual(self.lookup(mx_cache, 'example.com')[1], 0)
+        self.now += 2
+        self.assertEqual(self.lookup(mx_cache, 'example.com')[1], 1)
+
+    def test_ttls_are_clamped(self):
+        mx_cache = self.make_cache()
+        self.answers['short.example'] = MXAnswer(5, 'mx.short.example.')
+
+        self.lookup(mx_cache, 'short.example')
+        self.now += 59
+        self.assertEqual(self.lookup(mx_cache, 'short.example')[1], 0)
+        self.now += 2
+        self.assertEqual(self.lookup(mx_cache, 'short.example')[1], 1)
+
+    def test_nxdomain_is_cached_for_the_negative_ttl(self):
+        mx_cache = self.make_cache()
+        self.answers['nowhere.invalid'] = dns.resolver.NXDOMAIN()
+
+        self.assertEqual(self.lookup(mx_cache, 'nowhere.invalid'), (None, 1))
+        self.now += 299
+        self.assertEqual(self.lookup(mx_cache, 'nowhere.invalid'), (None, 0))
+        self.now += 2
+        self.assertEqual(self.lookup(mx_cache, 'nowhere.invalid'), (None, 1))
+        self.assertEqual(mx_cache.stats()['negative_answers'], 2)
+
+    def test_timeouts_are_not_cached(self):
+        mx_cache = self.make_cache()
+        self.answers['slow.example'] = dns.exception.Timeout()
+
+        for n in range(2):
+            with self.assertRaises(dns.exception.Timeout):
+                self.lookup(mx_cache, 'slow.example')
+        self.assertEqual(mx_cache.stats()['misses'], 2)
+
+    def test_other_processes_share_answers_until_they_expire(self):
+        first, second = self.make_cache(shared=True), self.make_cache(shared=True)
+        self.answers['example.com'] = MXAnswer(120, 'mx.example.com.')
+
+        self.lookup(first, 'example.com')
+        self.now += 60
+        self.assertEqual(self.lookup(second, 'example.com'), (['mx.example.com.'], 0))
+        # Only what was left of the ttl
+        self.now += 61
+        self.assertEqual(self.lookup(second, 'example.com')[1], 1)
+
+    def test_stats(self):
+        mx_cache = self.make_cache(shared=True)
+        self.answers['example.com'] = MXAnswer(120, 'mx.example.com.')
+        self.answers['nowhere.invalid'] = dns.resolver.NoAnswer()
+
+        self.lookup(mx_cache, 'example.com')
+        self.lookup(mx_cache, 'example.com')
+        self.lookup(mx_cache, 'nowhere.invalid')
+        mx_cache.clear()
+        self.lookup(mx_cache, 'example.com')
+
+        stats = mx_cache.stats()
+        self.assertEqual(
+            {name: stats[name] for name in ('local_hits', 'shared_hits', 'misses', 'negative_answers', 'size')},
+            {'local_hits': 1, 'shared_hits': 1, 'misses': 2, 'negative_answers': 1, 'size': 1},
+        )
+        self.assertGreaterEqual(stats['slowest_lookup'], stats['average_lookup'])
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.limiter = TokenBucketLimiter({'ip': (3, 60), 'page': (10, 60)})
+        self.now = 1000.0
+
+    def hit(self, **values):
+        with mock.patch('custom_comments.throttle.time.time', return_value=self.now):
+            return self.limiter.hit(**values)
+
+    def test_capacity_then_retry_after(self):
+        for n in range(3):
+            self.assertEqual(self.hit(ip='1.2.3.4'), 0)
+        # One token comes back every 20 seconds
+        self.assertEqual(self.hit(ip='1.2.3.4'), 20)
+        # Other clients have their own bucket
+        self.assertEqual(self.hit(ip='5.6.7.8'), 0)
+
+    def test_refill(self):
+        for n in range(3):
+            self.hit(ip='1.2.3.4')
+        self.now += 30
+        self.assertEqual(self.hit(ip='1.2.3.4'), 0)
+        self.assertEqual(self.hit(ip='1.2.3.4'), 10)
+
+    def test_refused_requests_take_no_tokens(self):
+        for n in range(3):
+            self.hit(ip='1.2.3.4', page=1)
+        self.assertTrue(self.hit(ip='1.2.3.4', page=1))
+
+        # The page bucket wasn't charged for the refused request
+        for n in range(7):
+            self.assertEqual(self.hit(page=1), 0)
+        self.assertTrue(self.hit(page=1))
+
+    def test_unknown_scopes_and_blank_values_are_ignored(self):
+        for n in range(5):
+            self.assertEqual(self.hit(ip='', email='reader@example.com'), 0)
+
+
+class CommentPostingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(depth=1)
+        index = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.post = index.add_child(instance=BlogPage(
+            title="Post", slug="post", date=timezone.now().date(), allow_comments=True,
+            body=[('paragraph', '<p>Hello</p>')],
+        ))
+
+    def submit(self, ajax=True, **data):
+        fields = get_form()(self.post).generate_security_data()
+        fields.update({'name': "reader", 'email': "reader@example.com", 'comment': "Nice post"}, **data)
+        headers = {'x-requested-with': 'XMLHttpRequest'} if ajax else {}
+        return self.client.post(reverse('post_comment', args=[self.post.pk]), fields, headers=headers)
+
+    def limits(self, **limits):
+        return mock.patch.object(throttle.comment_throttle, 'limits', limits)
+
+    def test_comment_is_saved_before_the_response(self):
+        response = self.submit()
+
+        self.assertEqual(response.status_code, 200)
+        comment = get_model().objects.get()
+        self.assertFalse(comment.is_public)
+        self.assertEqual(comment.verification.status, CommentVerification.PENDING)
+
+    def test_every_post_is_throttled(self):
+        with self.limits(ip=(2, 60)):
+            self.assertEqual(self.submit(ajax=False).status_code, 400)
+            self.assertEqual(self.submit(ajax=False).status_code, 400)
+            response = self.submit(ajax=False)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_invalid_comments_do_not_charge_the_page(self):
+        with self.limits(page=(1, 60)):
+            for n in range(3):
+                self.assertEqual(self.submit(email="not an email").status_code, 400)
+            self.assertEqual(self.submit().status_code, 200)
+            self.assertEqual(self.submit(email="other@example.com").status_code, 429)
+        self.assertEqual(get_model().objects.count(), 1)
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+
+import cachetools
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+
+def client_ip(request):
+    """
+    The client's address. With COMMENT_RATE_LIMIT_PROXIES = n trusted reverse proxies in
+    front of us, it is the n-th X-Forwarded-For entry from the right (the ones further
+    left are whatever the client chose to send).
+    """
+    proxies = getattr(settings, 'COMMENT_RATE_LIMIT_PROXIES', 0)
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class TokenBucketLimiter(object):
+    """
+    Token buckets kept in the shared cache, so every worker sees the same counts.
+    A bucket holds up to capacity tokens and refills at capacity / period tokens a second;
+    each accepted request takes one token from every bucket it is keyed by.
+
+    Read-modify-write against the cache is not atomic, so concurrent requests can slip a
+    token or two past the limit; that is fine for flood control. When the shared cache is
+    down the buckets live in this process instead.
+    """
+
+    key_prefix = 'comment-throttle:'
+
+    def __init__(self, limits, fallback_size=10000):
+        # {scope: (capacity, period in seconds)}
+        self.limits = limits
+        self.local = cachetools.TTLCache(
+            maxsize=fallback_size,
+            ttl=max([period for capacity, period in limits.values()] or [60]),
+        )
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        return cls(getattr(settings, 'COMMENT_RATE_LIMITS', {}))
+
+    def bucket_key(self, scope, value):
+        digest = hashlib.md5(str(value).lower().encode('utf-8')).hexdigest()
+        return '%s%s:%s' % (self.key_prefix, scope, digest)
+
+    def get_states(self, keys):
+        try:
+            return cache.get_many(keys)
+        except Exception:
+            logger.warning("Shared cache unavailable, throttling comments per process", exc_info=True)
+            with self.lock:
+                return {key: self.local[key] for key in keys if key in self.local}
+
+    def set_states(self, states):
+        with self.lock:
+            self.local.update(states)
+        try:
+            cache.set_many(states, max(period for capacity, period in self.limits.values()))
+        except Exception:
+            pass
+
+    def hit(self, **values):
+        """
+        Take a token from the bucket of each scope=value given. Returns 0 when the request
+        may go ahead, otherwise the seconds until it would (and no tokens are taken).
+        """
+        buckets = {
+            self.bucket_key(scope, value): self.limits[scope]
+            for scope, value in values.items() if value and scope in self.limits
+        }
+        if not buckets:
+            return 0
+
+        now = time.time()
+        states = self.get_states(list(buckets))
+
+        tokens = {}
+        retry_after = 0
+        for key, (capacity, period) in buckets.items():
+            available, updated = states.get(key, (capacity, now))
+            available = min(capacity, available + (now - updated) * capacity / period)
+            tokens[key] = available
+            if available < 1:
+                retry_after = max(retry_after, math.ceil((1 - available) * period / capacity))
+
+        if retry_after:
+            return retry_after
+
+        self.set_states({key: (available - 1, now) for key, available in tokens.items()})
+        return 0
+
+
+comment_throttle = TokenBucketLimiter.from_settings()
+
+
+def throttle_comment(request):
+    """
+    Seconds the poster of a comment has to wait, or 0. Keyed by client IP and the email as
+    posted, so it looks at nothing but the raw request and runs before any validation.
+    """
+    return comment_throttle.hit(
+        ip=client_ip(request),
+        email=request.POST.get('email', '').strip(),
+    )
+
+
+def throttle_page(page_id):
+    """
+    Seconds before another comment may go on a page, or 0. Only valid comments are charged,
+    so a flood of junk can't lock a page's comments for everyone else.
+    """
+    return comment_throttle.hit(page=page_id)
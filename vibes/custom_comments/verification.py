@@ -0,0 +1,155 @@
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import dns.exception
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from custom_comments import get_model
+from custom_comments.models import CommentVerification
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def dns_mx_resolver(domain, timeout):
+    """True if the domain has MX records. Raises dns.exception.Timeout when the resolver is too slow."""
+    from custom_comments.forms import cached_dns_resolver
+    return bool(cached_dns_resolver(domain, lifetime=timeout))
+
+
+class StubMXResolver(object):
+    """
+    Answers MX lookups from fixed lists instead of the network, for tests and local
+    development. Use it as COMMENT_MX_RESOLVER, as an instance or by dotted path (which
+    gets one with the default lists).
+    """
+
+    def __init__(self, domains_with_mx=('example.com',), slow_domains=()):
+        self.domains_with_mx = set(domains_with_mx)
+        self.slow_domains = set(slow_domains)
+        self.lookups = []
+
+    def __call__(self, domain, timeout):
+        self.lookups.append(domain)
+        if domain in self.slow_domains:
+            raise dns.exception.Timeout()
+        return domain in self.domains_with_mx
+
+
+def get_resolver():
+    """COMMENT_MX_RESOLVER as a callable(domain, timeout); a resolver class is instantiated"""
+    resolver = getattr(settings, 'COMMENT_MX_RESOLVER', 'custom_comments.verification.dns_mx_resolver')
+    if isinstance(resolver, str):
+        resolver = import_string(resolver)
+    if isinstance(resolver, type):
+        resolver = resolver()
+    return resolver
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'COMMENT_MX_WORKERS', 4),
+                thread_name_prefix='comment-mx',
+            )
+    return _executor
+
+
+def queue_verification(comment):
+    """
+    Mark a freshly saved (hidden) comment as pending and check its email domain in the
+    background once the transaction commits. COMMENT_MX_WORKERS = 0 checks inline instead.
+    """
+    CommentVerification.objects.create(comment=comment)
+
+    if getattr(settings, 'COMMENT_MX_WORKERS', 4) == 0:
+        transaction.on_commit(lambda: verify_comment(comment.pk))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(run_verification, comment.pk))
+
+
+def run_verification(comment_pk):
+    """verify_comment for the worker threads, which have their own db connection to tidy up"""
+    try:
+        verify_comment(comment_pk)
+    except Exception:
+        logger.exception("MX verification of comment %s failed", comment_pk)
+    finally:
+        connection.close()
+
+
+def verify_comment(comment_pk):
+    """Look up the MX records of the commenter's domain, then publish the comment or flag it"""
+    comment = get_model().objects.select_related('verification').filter(pk=comment_pk).first()
+    if comment is None:
+        return
+    verification = getattr(comment, 'verification', None)
+    if verification is not None and verification.status != CommentVerification.PENDING:
+        # A moderator got to it first
+        return
+
+    domain = comment.user_email.rpartition('@')[2]
+    reason = ""
+    try:
+        has_mx = get_resolver()(domain, getattr(settings, 'COMMENT_MX_TIMEOUT', 5))
+        if not has_mx:
+            reason = "No MX records found for %s" % domain
+    except dns.exception.Timeout:
+        has_mx = False
+        reason = "MX lookup for %s timed out" % domain
+    except dns.exception.DNSException as e:
+        has_mx = False
+        reason = "MX lookup for %s failed: %s" % (domain, e)
+    except Exception as e:
+        # Anything else (a broken resolver, the cache being down) goes to a moderator
+        # rather than leaving the comment pending forever
+        logger.exception("MX lookup for comment %s failed", comment_pk)
+        has_mx = False
+        reason = "MX lookup for %s failed: %s" % (domain, e)
+
+    with transaction.atomic():
+        if has_mx:
+            comment.is_public = True
+            comment.save(update_fields=['is_public'])
+
+        CommentVerification.objects.update_or_create(
+            comment_id=comment.pk,
+            defaults={
+                'status': CommentVerification.VERIFIED if has_mx else CommentVerification.FLAGGED,
+                'reason': reason[:255],
+                'checked_at': timezone.now(),
+            },
+        )
+
+
+def retry_stale_verifications(older_than=None):
+    """
+    Check again the comments still pending verification after older_than seconds
+    (COMMENT_MX_RETRY_AFTER by default), e.g. because the process that queued them died
+    before its worker got to them. Runs inline; returns how many were checked.
+    """
+    if older_than is None:
+        older_than = getattr(settings, 'COMMENT_MX_RETRY_AFTER', 10 * 60)
+    comment_pks = list(
+        CommentVerification.objects.filter(
+            status=CommentVerification.PENDING,
+            created_at__lte=timezone.now() - datetime.timedelta(seconds=older_than),
+        ).order_by('created_at').values_list('comment_id', flat=True)
+    )
+    for comment_pk in comment_pks:
+        try:
+            verify_comment(comment_pk)
+        except Exception:
+            logger.exception("MX verification of comment %s failed", comment_pk)
+    return len(comment_pks)
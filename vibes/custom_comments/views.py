@@ -3,13 +3,33 @@ from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.conf import settings
+from django.db import transaction
 
-from blog.models import BlogPage
-from custom_comments import get_model, get_form
+from blogs.models import BlogPage
+from blogs.utils.paginate import paginate_item
+from custom_comments import get_model, get_form, get_comment_thread
+from custom_comments.models import CommentVerification
+from custom_comments.verification import queue_verification
+from custom_comments.throttle import throttle_comment, throttle_page
+
+def too_many_comments(retry_after):
+    response = JsonResponse({
+        'success': False,
+        'error': 'Too many comments, please try again in %d seconds.' % retry_after,
+        'retry_after': retry_after,
+    }, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
 
 def post_comment(request, page_id):
-    # Fetch the BlogPage instance
-    page = get_object_or_404(BlogPage, id=page_id)
+    # Throttle floods (every POST, by client and email) before anything touches the db
+    if request.method == 'POST':
+        retry_after = throttle_comment(request)
+        if retry_after:
+            return too_many_comments(retry_after)
+
+    # Fetch the BlogPage instance, the form only needs its id
+    page = get_object_or_404(BlogPage.objects.live().only('id'), id=page_id)
 
     # Get the custom form (without passing target_object directly)
     CommentForm = get_form()
@@ -23,26 +43,36 @@ def post_comment(request, page_id):
         # Handle AJAX requests
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             if form.is_valid():
+                retry_after = throttle_page(page.pk)
+                if retry_after:
+                    return too_many_comments(retry_after)
+
                 # Get the comment model dynamically
                 Comment = get_model()
 
-                # Save the comment
+                # Save the comment, hidden until the email domain checks out
                 comment = Comment(
                     user_name=form.cleaned_data['name'],
                     comment=form.cleaned_data['comment'],
-                    email=form.cleaned_data['email'],
-                    # Get the content type of the BlogPage model
-                    content_type=ContentType.objects.get_for_model(page),
+                    user_email=form.cleaned_data['email'],
+                    # Get the content type of the BlogPage model (cached by ContentTypeManager)
+                    content_type=ContentType.objects.get_for_model(BlogPage),
                     object_pk=page.pk,  # Relating the comment to the blog post
                     site_id=getattr(settings, 'SITE_ID', 1),
                     submit_date=timezone.now(),
+                    is_public=False,
                 )
-                comment.save()
+                # Written (with its pending verification row) before we answer, the MX
+                # lookup then happens in the background and publishes it when it passes
+                with transaction.atomic():
+                    comment.save()
+                    queue_verification(comment)
 
                 # Return a success response
                 return JsonResponse({
                     'success': True,
-                    'message': 'Comment submitted successfully!',
+                    'message': 'Comment submitted! It will appear once your email has been verified.',
+                    'status': CommentVerification.PENDING,
                     'comment': {
                         'user_name': comment.user_name,
                         'comment': comment.comment,
@@ -58,3 +88,25 @@ def post_comment(request, page_id):
 
     # Fallback in case it's not an AJAX request
     return JsonResponse({'error': 'Invalid request'}, status=400)
+
+
+def comment_list(request, page_id):
+    """A page of the public comments on a BlogPage, as JSON (?page=x)"""
+    page = get_object_or_404(BlogPage.objects.live().only('id'), id=page_id)
+
+    comments = paginate_item(request, get_comment_thread(page), settings.BLOG_COMMENTS_PER_PAGE)
+
+    return JsonResponse({
+        'success': True,
+        'comments': [
+            {
+                'user_name': comment.user_name,
+                'comment': comment.comment,
+                'submit_date': comment.submit_date.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            for comment in comments
+        ],
+        'page': comments.number,
+        'has_next': comments.has_next(),
+        'count': comments.paginator.count,
+    })
@@ -0,0 +1,75 @@
+from django.utils.functional import classproperty
+
+from wagtail import hooks
+from wagtail.snippets.bulk_actions.snippet_bulk_action import SnippetBulkAction
+from wagtail.snippets.models import register_snippet
+from wagtail.snippets.permissions import get_permission_name
+
+from . import get_model as get_comment_model
+from .moderation import APPROVE, REMOVE, SPAM, moderate_comments
+
+# Get the model returned by get_comment_model
+Comment = get_comment_model()
+
+# Dynamically register the Comment model as a snippet
+register_snippet(Comment)
+
+
+class ModerateCommentsBulkAction(SnippetBulkAction):
+    """Base for the comment moderation bulk actions; the whole selection is changed with one UPDATE"""
+    moderation_action = None
+    template_name = "custom_comments/bulk_actions/confirm_bulk_moderate.html"
+
+    @classproperty
+    def models(cls):
+        return [Comment]
+
+    @classmethod
+    def get_queryset(cls, model, object_ids):
+        # Just what the confirmation list shows
+        return model.objects.filter(pk__in=object_ids).only('pk', 'user_name', 'comment')
+
+    def check_perm(self, snippet):
+        if getattr(self, 'can_moderate_items', None) is None:
+            self.can_moderate_items = self.request.user.has_perm(get_permission_name('change', self.model))
+        return self.can_moderate_items
+
+    @classmethod
+    def execute_action(cls, objects, **kwargs):
+        return moderate_comments([comment.pk for comment in objects], cls.moderation_action), 0
+
+    def get_success_message(self, num_parent_objects, num_child_objects):
+        return "%s: %d comment(s) updated" % (self.display_name, num_parent_objects)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['action_name'] = self.display_name
+        return context
+
+
+@hooks.register('register_bulk_action')
+class ApproveCommentsBulkAction(ModerateCommentsBulkAction):
+    display_name = "Approve"
+    action_type = "approve_comments"
+    aria_label = "Approve selected comments"
+    action_priority = 10
+    moderation_action = APPROVE
+
+
+@hooks.register('register_bulk_action')
+class RemoveCommentsBulkAction(ModerateCommentsBulkAction):
+    display_name = "Remove"
+    action_type = "remove_comments"
+    aria_label = "Remove selected comments"
+    action_priority = 20
+    moderation_action = REMOVE
+
+
+@hooks.register('register_bulk_action')
+class SpamCommentsBulkAction(ModerateCommentsBulkAction):
+    display_name = "Spam"
+    action_type = "spam_comments"
+    aria_label = "Mark selected comments as spam"
+    action_priority = 25
+    classes = {"serious"}
+    moderation_action = SPAM
@@ -0,0 +1,107 @@
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
+
+from PIL import Image
+
+
+# The landing header comes in one image per breakpoint, images/<width>_Resources_landing_image.*
+LANDING_WIDTHS = (1920, 1440, 1366, 1024, 768, 414, 375, 320)
+
+# (Pillow format, save options, mime type) for each output
+FORMATS = {
+    'jpg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}, 'image/jpeg'),
+    'webp': ('WEBP', {'quality': 80, 'method': 6}, 'image/webp'),
+    'avif': ('AVIF', {'quality': 60}, 'image/avif'),
+}
+
+
+def build_dir():
+    return settings.ASSETS_BUILD_DIR
+
+
+def landing_formats():
+    """LANDING_IMAGE_FORMATS that this Pillow build can write, best first, then the jpg every browser takes"""
+    Image.init()
+    formats = [
+        output_format for output_format in getattr(settings, 'LANDING_IMAGE_FORMATS', ('webp',))
+        if FORMATS[output_format][0] in Image.SAVE
+    ]
+    return formats + ['jpg']
+
+
+def landing_source(width):
+    for extension in ('png', 'jpg', 'jpeg'):
+        path = finders.find('images/%d_Resources_landing_image.%s' % (width, extension))
+        if path:
+            return path
+    return None
+
+
+def is_stale(target, source):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+def convert(source, target, output_format):
+    pillow_format, options, mime_type = FORMATS[output_format]
+    with Image.open(source) as image:
+        # The pngs are fully opaque; dropping the alpha channel lets them go to jpeg
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(target, pillow_format, **options)
+
+
+def build_landing_images(log=None):
+    """
+    images/landing/<width>.<format> for every breakpoint and format, converted from the
+    source images. Outputs newer than their source are left alone. Returns
+    [(width, [(url relative to css/, mime type), ...])], widest first.
+    """
+    output_dir = os.path.join(build_dir(), 'images', 'landing')
+    os.makedirs(output_dir, exist_ok=True)
+
+    variants = []
+    for width in LANDING_WIDTHS:
+        source = landing_source(width)
+        if source is None:
+            continue
+        urls = []
+        for output_format in landing_formats():
+            name = '%d.%s' % (width, output_format)
+            target = os.path.join(output_dir, name)
+            if is_stale(target, source):
+                convert(source, target, output_format)
+                if log:
+                    log("%s: %s -> %s bytes" % (name, os.path.getsize(source), os.path.getsize(target)))
+            urls.append(('../images/landing/%s' % name, FORMATS[output_format][2]))
+        variants.append((width, urls))
+    return variants
+
+
+def build_welcome_css(variants):
+    """
+    css/welcome_page_img.css, the landing header background per breakpoint. Its image urls
+    are relative, so ManifestStaticFilesStorage rewrites them to the hashed names on collectstatic.
+    """
+    output_dir = os.path.join(build_dir(), 'css')
+    os.makedirs(output_dir, exist_ok=True)
+
+    rules = [
+        {'max_width': width, 'fallback': urls[-1][0], 'sources': urls}
+        for width, urls in variants
+    ]
+    css = render_to_string('home/welcome_page_img.css', {
+        'default': rules[0] if rules else None,
+        'breakpoints': rules[1:],
+    })
+    path = os.path.join(output_dir, 'welcome_page_img.css')
+    with open(path, 'w') as f:
+        f.write(css)
+    return path
+
+
+def build_assets(log=None):
+    """Everything under ASSETS_BUILD_DIR; run by build_assets and before collectstatic"""
+    return build_welcome_css(build_landing_images(log))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from home.assets import build_assets
+
+
+class Command(BaseCommand):
+    help = "Convert the landing images to modern formats and write welcome_page_img.css into ASSETS_BUILD_DIR"
+
+    def handle(self, *args, **options):
+        path = build_assets(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS("Wrote %s" % path))
@@ -0,0 +1,12 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+
+from home.assets import build_assets
+
+
+class Command(CollectStaticCommand):
+    """collectstatic, with the generated assets built first so they are collected (and hashed) too"""
+
+    def handle(self, **options):
+        if not options['dry_run']:
+            build_assets(log=self.stdout.write if options['verbosity'] > 1 else None)
+        return super().handle(**options)
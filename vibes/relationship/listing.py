@@ -0,0 +1,47 @@
+from wagtail.images import get_image_model
+
+
+def profile_documents(profile):
+    """
+    (name, bio, icon id) of each document block in a profile StreamField, read from its
+    raw json so no block is turned into python (and no icon fetched) on the way
+    """
+    return [
+        (block['value'].get('name', ''), block['value'].get('bio') or '', block['value'].get('icon'))
+        for block in profile.raw_data
+        if block['type'] == 'document' and isinstance(block['value'], dict)
+    ]
+
+
+def profile_cards(pages):
+    """
+    Listing cards for a page of profiles: [{'page', 'featured', 'documents': [{'name', 'bio', 'icon'}]}],
+    in the order given. Children that aren't Relationship pages get no documents.
+    Two queries however many cards: the profiles' json and flags, then every icon
+    (with its renditions) at once.
+    """
+    from relationship.models import Relationship
+
+    pages = list(pages)
+    profiles = {
+        pk: (featured, profile_documents(profile))
+        for pk, featured, profile in Relationship.objects.filter(
+            pk__in=[page.pk for page in pages]
+        ).order_by().values_list('pk', 'featured', 'profile')
+    }
+
+    icon_ids = {icon_id for featured, documents in profiles.values() for name, bio, icon_id in documents if icon_id}
+    icons = get_image_model().objects.prefetch_related('renditions').in_bulk(icon_ids) if icon_ids else {}
+
+    cards = []
+    for page in pages:
+        featured, documents = profiles.get(page.pk, (False, []))
+        cards.append({
+            'page': page,
+            'featured': featured,
+            'documents': [
+                {'name': name, 'bio': bio, 'icon': icons.get(icon_id)}
+                for name, bio, icon_id in documents
+            ],
+        })
+    return cards
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:01
+
+import blogs.utils.conditional
+import django.db.models.deletion
+import wagtail.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('wagtailcore', '0094_alter_page_locale'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Relationship',
+            fields=[
+                ('page_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='wagtailcore.page')),
+                ('intro', wagtail.fields.RichTextField(blank=True)),
+                ('description', wagtail.fields.RichTextField(blank=True)),
+                ('featured', models.BooleanField(default=False)),
+                ('profile', wagtail.fields.StreamField([('document', 3)], block_lookup={0: ('wagtail.blocks.CharBlock', (), {'help_text': 'Title of the document', 'required': True}), 1: ('wagtail.blocks.TextBlock', (), {'help_text': 'Short description of the document', 'required': False}), 2: ('wagtail.images.blocks.ImageChooserBlock', (), {'help_text': 'Optional custom icon for the document', 'required': False}), 3: ('wagtail.blocks.StructBlock', [[('name', 0), ('bio', 1), ('icon', 2)]], {'icon': 'doc-full', 'label': 'Document'})})),
+            ],
+            options={
+                'verbose_name': 'Profile',
+            },
+            bases=(blogs.utils.conditional.ConditionalPageMixin, 'wagtailcore.page'),
+        ),
+    ]
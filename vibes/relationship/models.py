@@ -1,13 +1,16 @@
 from django.db import models
 from wagtail.models import Page
 from wagtail.fields import RichTextField, StreamField
-from wagtail.admin.panels import FieldPanel, StreamField
+from wagtail.admin.panels import FieldPanel
 from wagtail import blocks
 from wagtail.images.blocks import ImageChooserBlock
+from blogs.utils.choosers import prime_streams
 from blogs.utils.paginate import paginate_item
+from blogs.utils.conditional import ConditionalPageMixin, newest, queryset_freshness
+from relationship.listing import profile_cards
 
 
-class Relationship(Page):
+class Relationship(ConditionalPageMixin, Page):
     intro = RichTextField(blank=True)
     description = RichTextField(blank=True)
     featured = models.BooleanField(default=False)
@@ -29,15 +32,30 @@ class Relationship(Page):
     class Meta:
         verbose_name = "Profile"
 
+    def get_validators(self, request):
+        newest_child, child_count = queryset_freshness(self.get_children().live())
+        return newest(self.last_published_at, newest_child), (child_count,)
+
     def get_context(self, request):
         """Add pagination to the profiles using the existing paginate_item utility."""
         is_featured = request.GET.get('featured', 'false').lower() == 'true'
         context = super().get_context(request)
+        # This profile's own document icons, in bulk before its blocks render
+        prime_streams([self.profile])
         all_profiles = self.get_children().live().order_by("-first_published_at")
 
         if is_featured:
-            all_profiles = self.get_children().live().type(Relationship).filter(relationship__featured=True).order_by("-first_published_at")
+            # Straight from the relationship table, no content type join
+            all_profiles = Relationship.objects.child_of(self).live().filter(featured=True).defer(
+                'intro', 'description', 'profile'
+            ).order_by("-first_published_at")
             context["is_featured"] = True
 
-        context["paginated_resources"] = paginate_item(request, all_profiles, 10)
+        profiles = paginate_item(
+            request, all_profiles, 10, keyset=True,
+            count_signature={'parent': self.pk, 'featured': is_featured},
+        )
+        context["paginated_resources"] = profiles
+        # Document names, bios and icons for the cards, without deserializing each profile
+        context["profile_cards"] = profile_cards(profiles)
         return context
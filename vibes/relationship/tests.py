@@ -0,0 +1,68 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page
+
+from blogs.tests import TEST_STORAGES
+from relationship.listing import profile_cards, profile_documents
+from relationship.models import Relationship
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ProfileListingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.icons = [get_image_model().objects.create(title="Icon %s" % n, file=get_test_image_file()) for n in range(3)]
+        self.parent = Page.objects.get(depth=1).add_child(instance=Relationship(
+            title="Profiles", slug="profiles", profile=[],
+        ))
+        self.profiles = [
+            self.add_profile("Ann", featured=True, icons=self.icons[:2]),
+            self.add_profile("Ben", icons=self.icons[2:]),
+            self.add_profile("Cal", featured=True, icons=[None]),
+        ]
+
+    def add_profile(self, title, featured=False, icons=()):
+        profile = self.parent.add_child(instance=Relationship(
+            title=title, slug=title.lower(), featured=featured,
+            profile=[
+                ('document', {'name': "%s %s" % (title, n), 'bio': "About %s" % title, 'icon': icon})
+                for n, icon in enumerate(icons)
+            ],
+        ))
+        profile.save_revision().publish()
+        return profile
+
+    def test_documents_are_read_from_the_json(self):
+        profile = Relationship.objects.get(pk=self.profiles[0].pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(profile_documents(profile.profile), [
+                ("Ann 0", "About Ann", self.icons[0].pk),
+                ("Ann 1", "About Ann", self.icons[1].pk),
+            ])
+
+    def test_icons_are_loaded_in_bulk(self):
+        pages = list(Page.objects.filter(pk__in=[profile.pk for profile in self.profiles]).order_by('title'))
+        # The profiles, then every icon and its renditions at once
+        with self.assertNumQueries(3):
+            cards = profile_cards(pages)
+
+        self.assertEqual([card['page'] for card in cards], pages)
+        self.assertEqual([card['featured'] for card in cards], [True, False, True])
+        self.assertEqual([document['icon'] for document in cards[0]['documents']], self.icons[:2])
+        self.assertEqual(cards[1]['documents'][0]['name'], "Ben 0")
+        self.assertIsNone(cards[2]['documents'][0]['icon'])
+
+    def test_featured_listing(self):
+        request = RequestFactory().get('/profiles/', {'featured': 'true'})
+        request.user = AnonymousUser()
+        context = Relationship.objects.get(pk=self.parent.pk).get_context(request)
+
+        self.assertTrue(context['is_featured'])
+        self.assertEqual(
+            [card['page'].title for card in context['profile_cards']],
+            [profile.title for profile in reversed(self.profiles) if profile.featured],
+        )
@@ -0,0 +1,301 @@
+import bisect
+import logging
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from blogs.utils.cache import bump_namespace, namespace_version
+
+
+logger = logging.getLogger(__name__)
+
+# Bumped with every change to what can be suggested; the change itself is logged under
+# the new version so other processes can apply it instead of rebuilding
+AUTOCOMPLETE_NAMESPACE = 'autocomplete'
+CHANGE_KEY = 'autocomplete-change:%s'
+# How long logged changes are kept, and the most a process catches up on before rebuilding
+CHANGE_LOG_TIMEOUT = 60 * 60
+MAX_CHANGES = 100
+# Logged for changes that touch too much to describe (categories, tag renames)
+REBUILD = 'rebuild'
+
+# Suggestions of each kind come in this order
+KINDS = ('post', 'category', 'tag', 'author')
+
+
+def term_keys(text):
+    """Case-folded keys for text: the whole thing, and from each later word on, so "hello world" is found by "wor" too"""
+    words = text.casefold().split()
+    return {' '.join(words[n:]) for n in range(len(words))}
+
+
+class PrefixIndex(object):
+    """
+    A sorted array of (key, entry id) answering prefix queries with bisect.
+    Entries are {'kind', 'label', 'url'} dicts, keyed by ids such as ('post', 12) or ('tag', 'alps'),
+    and can be added or dropped one at a time, e.g. when a single page is published.
+    """
+
+    def __init__(self, entries=()):
+        self.keys = []
+        self.entries = {}
+        self.lock = threading.Lock()
+        # Bulk load, sorting once instead of inserting in order
+        for entry in entries:
+            self.keys.extend(self._store(*entry))
+        self.keys.sort()
+
+    def _store(self, entry_id, kind, label, url, terms=()):
+        self.entries[entry_id] = {'kind': kind, 'label': label, 'url': url}
+        keys = set(term_keys(label))
+        for term in terms:
+            keys |= term_keys(term)
+        return [(key, entry_id) for key in keys]
+
+    def add(self, entry_id, kind, label, url, terms=()):
+        with self.lock:
+            self._remove(entry_id)
+            for item in self._store(entry_id, kind, label, url, terms):
+                bisect.insort(self.keys, item)
+
+    def remove(self, entry_id):
+        with self.lock:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        if self.entries.pop(entry_id, None) is not None:
+            self.keys = [item for item in self.keys if item[1] != entry_id]
+
+    def lookup(self, prefix, limit=8):
+        prefix = ' '.join(prefix.casefold().split())
+        if not prefix:
+            return []
+
+        with self.lock:
+            start = bisect.bisect_left(self.keys, (prefix,))
+            found = {}
+            # By position; keys[start:] would copy the whole tail of the array
+            for position in range(start, len(self.keys)):
+                key, entry_id = self.keys[position]
+                if not key.startswith(prefix):
+                    break
+                if entry_id not in found:
+                    found[entry_id] = self.entries[entry_id]
+                    # Enough candidates for every kind to get a look in
+                    if len(found) >= limit * len(KINDS):
+                        break
+
+        matches = sorted(found.values(), key=lambda entry: (KINDS.index(entry['kind']), entry['label'].casefold()))
+        return matches[:limit]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SuggestionIndex(PrefixIndex):
+    """
+    The autocomplete PrefixIndex, which also remembers the tags on each post so a tag
+    goes when the last live post carrying it is unpublished or loses it.
+    post_tags are (post id, tag entry) pairs.
+    """
+
+    def __init__(self, entries=(), post_tags=()):
+        self.post_tags = {}
+        self.tag_posts = {}
+        tags = {}
+        for post_id, tag in post_tags:
+            tags[tag[0]] = tag
+            self.post_tags.setdefault(post_id, set()).add(tag[0])
+            self.tag_posts.setdefault(tag[0], set()).add(post_id)
+        super().__init__(list(entries) + list(tags.values()))
+
+    def set_page(self, page_id, entries, tags):
+        """
+        Make one page's suggestions what they are now: its entries (none once it is
+        unpublished) and the tag entries on it. Applying the same change twice is harmless.
+        """
+        entry_ids = {entry[0] for entry in entries}
+        for entry_id in (('post', page_id), ('author', page_id)):
+            if entry_id not in entry_ids:
+                self.remove(entry_id)
+        for entry in entries:
+            self.add(*entry)
+
+        tags = {tag[0]: tag for tag in tags}
+        for tag_id in self.post_tags.pop(page_id, set()) - set(tags):
+            posts = self.tag_posts.get(tag_id, set())
+            posts.discard(page_id)
+            if not posts:
+                self.tag_posts.pop(tag_id, None)
+                self.remove(tag_id)
+        for tag_id, tag in tags.items():
+            if tag_id not in self.tag_posts:
+                self.add(*tag)
+            self.tag_posts.setdefault(tag_id, set()).add(page_id)
+        if tags:
+            self.post_tags[page_id] = set(tags)
+
+
+def blog_urls():
+    """(category url prefix, tag index url) from the first live blog index and tag index"""
+    from blogs.models import BlogIndexPage, BlogTagIndexPage
+
+    index = BlogIndexPage.objects.live().first()
+    tag_index = BlogTagIndexPage.objects.live().first()
+    return (
+        index.url + 'category/' if index is not None and index.url else None,
+        tag_index.url if tag_index is not None else None,
+    )
+
+
+def post_entry(page):
+    return ('post', page.pk), 'post', page.title, page.url
+
+
+def author_entry(page):
+    name = page.user.get_full_name() if page.user_id else ''
+    return ('author', page.pk), 'author', page.title, page.url, (name,)
+
+
+def tag_entry(name, tag_url):
+    url = '%s?%s' % (tag_url, urlencode({'tag': name})) if tag_url else None
+    return ('tag', name.casefold()), 'tag', name, url
+
+
+def category_entry(category, category_url):
+    url = '%s%s/' % (category_url, category.slug) if category_url else None
+    return ('category', category.pk), 'category', category.name, url
+
+
+def build_index():
+    """Everything suggestible: live post titles, the tags on them, categories and author pages"""
+    from blogs.models import AuthorPage, BlogPage, BlogPageTag
+    from blogs.utils.categories import all_categories
+
+    category_url, tag_url = blog_urls()
+    posts = BlogPage.objects.live().public()
+    entries = [post_entry(page) for page in posts.only('id', 'title', 'url_path')]
+    entries += [
+        author_entry(page)
+        for page in AuthorPage.objects.live().public().select_related('user').only(
+            'id', 'title', 'url_path', 'user__first_name', 'user__last_name')
+    ]
+    entries += [category_entry(category, category_url) for category in all_categories()]
+    post_tags = [
+        (post_id, tag_entry(name, tag_url))
+        for post_id, name in BlogPageTag.objects.filter(content_object__in=posts).values_list(
+            'content_object_id', 'tag__name')
+    ]
+    return SuggestionIndex(entries, post_tags)
+
+
+def page_change(page):
+    """(page id, entries, tag entries) for what a page contributes to the suggestions now"""
+    from blogs.models import AuthorPage, BlogPage
+
+    page = page.specific
+    if not page.live or page.get_view_restrictions().exists():
+        return page.pk, [], []
+    if isinstance(page, BlogPage):
+        tag_url = blog_urls()[1]
+        return page.pk, [post_entry(page)], [tag_entry(tag.name, tag_url) for tag in page.tags.all()]
+    if isinstance(page, AuthorPage):
+        return page.pk, [author_entry(page)], []
+    return page.pk, [], []
+
+
+# (version, checked at, index) for this process, swapped as a whole under _lock
+_state = (None, 0, None)
+_lock = threading.Lock()
+_rebuilding = False
+
+
+def logged_changes(version, current):
+    """The changes logged after version up to current, in order; None if some are gone or need a rebuild"""
+    if version is None or not 0 < current - version <= MAX_CHANGES:
+        return None
+    keys = [CHANGE_KEY % number for number in range(version + 1, current + 1)]
+    found = cache.get_many(keys)
+    changes = [found.get(key) for key in keys]
+    if None in changes or REBUILD in changes:
+        return None
+    return changes
+
+
+def rebuild(version):
+    """Build a fresh index on a background thread, the old one serving until it is swapped in"""
+    global _state, _rebuilding
+    try:
+        index = build_index()
+        with _lock:
+            _state = (version, time.monotonic(), index)
+    except Exception:
+        logger.exception("Rebuilding the autocomplete index failed")
+    finally:
+        _rebuilding = False
+        connection.close()
+
+
+def catch_up():
+    """
+    Bring this process's index up to the shared version: apply the logged changes, or
+    when they can't be had, rebuild in the background and keep answering from the old
+    index meanwhile. Only the very first index is built inline.
+    """
+    global _state, _rebuilding
+    with _lock:
+        version, checked, index = _state
+        now = time.monotonic()
+        current = namespace_version(AUTOCOMPLETE_NAMESPACE)
+        if index is None:
+            index = build_index()
+            version = current
+        elif current != version:
+            changes = logged_changes(version, current)
+            if changes is not None:
+                for change in changes:
+                    index.set_page(*change)
+                version = current
+            elif not _rebuilding:
+                _rebuilding = True
+                threading.Thread(target=rebuild, args=(current,), name='autocomplete-rebuild', daemon=True).start()
+        _state = (version, now, index)
+        return index
+
+
+def get_index():
+    """
+    This process's prefix index. Built on first use, then kept in step with the shared
+    change log, which is re-read every BLOG_AUTOCOMPLETE_RECHECK seconds.
+    """
+    version, checked, index = _state
+    if index is not None and time.monotonic() - checked < getattr(settings, 'BLOG_AUTOCOMPLETE_RECHECK', 5):
+        return index
+    return catch_up()
+
+
+def autocomplete(prefix, limit=None):
+    return get_index().lookup(prefix, limit or getattr(settings, 'BLOG_AUTOCOMPLETE_LIMIT', 8))
+
+
+def record_change(change):
+    """Log a change for every process under the next version, then apply it here"""
+    version = bump_namespace(AUTOCOMPLETE_NAMESPACE)
+    cache.set(CHANGE_KEY % version, change, CHANGE_LOG_TIMEOUT)
+    if _state[2] is not None:
+        catch_up()
+
+
+def page_changed(page):
+    """A page was published or unpublished; its suggestions change once the transaction commits"""
+    change = page_change(page)
+    transaction.on_commit(lambda: record_change(change))
+
+
+def rebuild_everywhere():
+    """Categories and tag renames touch too many entries to log; every process rebuilds"""
+    transaction.on_commit(lambda: record_change(REBUILD))
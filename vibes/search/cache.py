@@ -0,0 +1,67 @@
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+
+from wagtail.models import Page
+
+from blogs.utils.cache import namespace_key
+from search.engine import SearchResultsPage, search_pages, use_postgres_search
+
+
+# Bumped on every publish/unpublish
+SEARCH_NAMESPACE = 'search-results'
+
+# Words that don't change what a query finds. "or" is missing on purpose, it is an operator.
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has he in is it its of on that the to was were will with
+""".split())
+
+# A quoted phrase, or a run of anything that isn't whitespace
+TOKENS = re.compile(r'"[^"]*"|\S+')
+
+
+def normalize_query(query_string):
+    """
+    Case-fold, collapse whitespace and drop stop words outside quoted phrases, so that
+    "The  Dolomites" and "dolomites" share a cache entry. A query made only of stop words
+    is kept as it is (folded) rather than emptied.
+    """
+    tokens = TOKENS.findall(query_string.casefold())
+    kept = [token for token in tokens if token.startswith('"') or token.lstrip('-') not in STOP_WORDS]
+    return ' '.join(kept or tokens)
+
+
+def run_search(query_string, page_number, per_page=10):
+    if use_postgres_search():
+        return search_pages(query_string, page_number, per_page)
+
+    paginator = Paginator(Page.objects.live().search(query_string), per_page)
+    try:
+        results = paginator.page(page_number)
+    except PageNotAnInteger:
+        results = paginator.page(1)
+    except EmptyPage:
+        results = paginator.page(paginator.num_pages)
+    # Detached from the queryset, so it can go in the cache
+    return SearchResultsPage(list(results), results.number, results.has_next())
+
+
+def cached_search(query_string, page_number):
+    """A SearchResultsPage for an already normalized query, from the cache until the next publish"""
+    try:
+        page_number = max(1, int(page_number))
+    except (TypeError, ValueError):
+        page_number = 1
+
+    key = namespace_key(SEARCH_NAMESPACE, {
+        'query': query_string,
+        'page': page_number,
+        'engine': 'postgres' if use_postgres_search() else 'wagtail',
+    })
+    results = cache.get(key)
+    if results is None:
+        results = run_search(query_string, page_number)
+        cache.set(key, results, getattr(settings, 'BLOG_SEARCH_CACHE_TIMEOUT', 60 * 5))
+    return results
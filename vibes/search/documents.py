@@ -0,0 +1,68 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+
+from blogs.utils.text import stream_text
+from search.models import SearchDocument
+
+
+def postgres_search_available():
+    return connection.vendor == 'postgresql'
+
+
+def search_config():
+    """The text search configuration (dictionary) used for both documents and queries"""
+    return getattr(settings, 'BLOG_SEARCH_CONFIG', 'english')
+
+
+def document_fields(page):
+    """(title, keywords, body) to index for a page, or None if it isn't searched this way"""
+    from blogs.models import AuthorPage, BlogPage
+
+    if isinstance(page, BlogPage):
+        keywords = [tag.name for tag in page.tags.all()]
+        keywords += [category.name for category in page.categories.all()]
+        return page.title, ' '.join(keywords), stream_text(page.body)
+
+    if isinstance(page, AuthorPage):
+        keywords = [page.user.get_full_name(), page.location, page.languages]
+        return page.title, ' '.join(filter(None, keywords)), stream_text(page.bio)
+
+    return None
+
+
+def weighted_vector():
+    config = search_config()
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('keywords', weight='B', config=config)
+        + SearchVector('body', weight='C', config=config)
+    )
+
+
+def text_hash(title, keywords, body):
+    return hashlib.md5('\x00'.join((title, keywords, body)).encode('utf-8')).hexdigest()
+
+
+def remove_search_document(page):
+    SearchDocument.objects.filter(page_id=page.pk).delete()
+
+
+def write_documents(documents):
+    """Insert or update SearchDocuments, then recompute their vectors in one UPDATE"""
+    if not documents:
+        return 0
+
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['page'],
+        update_fields=['title', 'keywords', 'body', 'text_hash'],
+    )
+    if postgres_search_available():
+        SearchDocument.objects.filter(
+            page_id__in=[document.page_id for document in documents]
+        ).update(search_vector=weighted_vector())
+    return len(documents)
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from wagtail.models import Page
+
+from search.documents import postgres_search_available, search_config
+from search.models import SearchDocument
+
+
+# ts_headline wraps matches in these; they are swapped for <mark> after escaping the text
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_STOP = '\ue001'
+
+
+def use_postgres_search():
+    return getattr(settings, 'BLOG_SEARCH_ENGINE', 'wagtail') == 'postgres' and postgres_search_available()
+
+
+class SearchResultsPage(object):
+    """
+    One page of ranked results. Quacks like django's Page for the search template,
+    but only knows whether there is a next page, not how many results there are.
+    """
+
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<SearchResultsPage %s>' % self.number
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def highlight(headline):
+    return mark_safe(
+        escape(headline).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    )
+
+
+def search_pages(query_string, page_number=1, per_page=10):
+    """
+    Rank live pages against a web-style query (quoted phrases, OR, -word) with the GIN
+    indexed tsvectors and return one SearchResultsPage of Pages, each carrying a
+    search_rank and an HTML search_headline.
+
+    Only per_page + 1 ranked ids are fetched (the extra one tells us there is a next page),
+    and ts_headline runs for the rows on the page alone, in a second small query.
+    """
+    max_results = getattr(settings, 'BLOG_SEARCH_MAX_RESULTS', 200)
+    page_number = max(1, min(page_number, max_results // per_page or 1))
+    offset = (page_number - 1) * per_page
+
+    query = SearchQuery(query_string, search_type='websearch', config=search_config())
+    ranked = list(
+        SearchDocument.objects
+        .filter(search_vector=query, page__live=True)
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .order_by('-rank', 'page_id')
+        .values_list('page_id', 'rank')[offset:offset + per_page + 1]
+    )
+    has_next = len(ranked) > per_page
+    ranked = ranked[:per_page]
+    ids = [page_id for page_id, rank in ranked]
+
+    headlines = dict(
+        SearchDocument.objects.filter(page_id__in=ids).annotate(
+            headline=SearchHeadline(
+                'body', query,
+                config=search_config(),
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_words=35,
+                min_words=15,
+                max_fragments=2,
+                fragment_delimiter=' … ',
+            )
+        ).values_list('page_id', 'headline')
+    )
+    pages = Page.objects.filter(pk__in=ids).in_bulk()
+
+    results = []
+    for page_id, rank in ranked:
+        page = pages.get(page_id)
+        if page is None:
+            continue
+        page.search_rank = rank
+        page.search_headline = highlight(headlines.get(page_id) or '')
+        results.append(page)
+    return SearchResultsPage(results, page_number, has_next)
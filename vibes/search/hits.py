@@ -0,0 +1,76 @@
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class HitRecorder(object):
+    """
+    Counts search query hits in memory and writes them to the search promotions
+    Query / QueryDailyHits tables every flush_interval seconds from a timer thread,
+    one UPDATE per distinct query instead of two writes per search.
+    flush_interval defaults to BLOG_SEARCH_HITS_FLUSH_INTERVAL; 0 writes each hit in the request.
+    Hits counted since the last flush are lost when the process exits.
+    """
+
+    def __init__(self, flush_interval=None):
+        self._flush_interval = flush_interval
+        self.hits = Counter()
+        self.lock = threading.Lock()
+        self.timer = None
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is None:
+            return getattr(settings, 'BLOG_SEARCH_HITS_FLUSH_INTERVAL', 30)
+        return self._flush_interval
+
+    def add(self, query_string):
+        flush_interval = self.flush_interval
+        with self.lock:
+            self.hits[query_string] += 1
+            if flush_interval and self.timer is None:
+                self.timer = threading.Timer(flush_interval, self.flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if not flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the counted hits; returns {query: hits} for what was written"""
+        from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+
+        with self.lock:
+            hits, self.hits = self.hits, Counter()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+        today = timezone.now().date()
+        for query_string, count in hits.items():
+            with transaction.atomic():
+                daily_hits, created = QueryDailyHits.objects.get_or_create(
+                    query=Query.get(query_string), date=today,
+                )
+                QueryDailyHits.objects.filter(pk=daily_hits.pk).update(hits=F('hits') + count)
+        return dict(hits)
+
+    def flush_from_timer(self):
+        # Runs on the timer thread, which has its own db connection to tidy up
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Writing search query hits failed")
+        finally:
+            connection.close()
+
+
+hit_recorder = HitRecorder()
@@ -0,0 +1,176 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from wagtail.search.backends import get_search_backends
+
+from search.documents import document_fields, text_hash, write_documents
+from search.models import SearchDocument
+
+
+logger = logging.getLogger(__name__)
+
+
+def deferred_models():
+    """Models with search_auto_update = False that the queue indexes instead"""
+    from blogs.models import AuthorPage, BlogPage
+    return (BlogPage, AuthorPage)
+
+
+def indexing_queryset(model):
+    """What document_fields touches, fetched up front for a whole batch"""
+    from blogs.models import AuthorPage, BlogPage
+
+    queryset = model.objects.all()
+    if model is BlogPage:
+        queryset = queryset.prefetch_related('tags', 'categories')
+    elif model is AuthorPage:
+        queryset = queryset.select_related('user')
+    return queryset
+
+
+def index_pages(model, page_ids, force=False):
+    """
+    Bring the wagtail search index and the SearchDocuments of some pages of one model up
+    to date. Pages whose indexed text hashes the same as their stored document are skipped
+    unless force is set. Returns the number of pages reindexed.
+    """
+    pages = list(indexing_queryset(model).filter(pk__in=page_ids))
+    hashes = dict(
+        SearchDocument.objects.filter(page_id__in=[page.pk for page in pages]).values_list('page_id', 'text_hash')
+    )
+
+    changed = []
+    documents = []
+    for page in pages:
+        title, keywords, body = document_fields(page)
+        digest = text_hash(title, keywords, body)
+        if not force and page.live and hashes.get(page.pk) == digest:
+            continue
+
+        changed.append(page)
+        if page.live:
+            documents.append(SearchDocument(
+                page_id=page.pk, title=title, keywords=keywords, body=body, text_hash=digest,
+            ))
+
+    if changed:
+        for backend in get_search_backends(with_auto_update=True):
+            backend.add_bulk(model, changed)
+    write_documents(documents)
+    # Only live pages are searched through documents
+    SearchDocument.objects.filter(page_id__in=[page.pk for page in pages if not page.live]).delete()
+    return len(changed)
+
+
+class IndexQueue(object):
+    """
+    Pages saved during a request are queued here (once the transaction commits) instead of
+    being indexed inside it. Saving a page several times before the flush indexes it once.
+    A timer thread flushes delay seconds after the first queued page, batch_size pages per
+    model at a time; delay = 0 indexes on commit, in the request, as wagtail would.
+    delay and batch_size default to BLOG_SEARCH_INDEX_DELAY / BLOG_SEARCH_INDEX_BATCH_SIZE.
+    Nothing is flushed at exit: pages still queued then are picked up by reindex_blogs.
+    """
+
+    def __init__(self, delay=None, batch_size=None):
+        self._delay = delay
+        self._batch_size = batch_size
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.timer = None
+
+    @property
+    def delay(self):
+        if self._delay is None:
+            return getattr(settings, 'BLOG_SEARCH_INDEX_DELAY', 2.0)
+        return self._delay
+
+    @property
+    def batch_size(self):
+        if self._batch_size is None:
+            return getattr(settings, 'BLOG_SEARCH_INDEX_BATCH_SIZE', 100)
+        return self._batch_size
+
+    def add(self, model, page_id):
+        transaction.on_commit(lambda: self.queue(model, page_id))
+
+    def queue(self, model, page_id):
+        delay = self.delay
+        with self.lock:
+            self.pending.setdefault(model, set()).add(page_id)
+            if delay and self.timer is None:
+                self.timer = threading.Timer(delay, self.flush_from_timer)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if not delay:
+            self.flush()
+
+    def discard(self, model, page_id):
+        with self.lock:
+            self.pending.get(model, set()).discard(page_id)
+
+    def flush(self):
+        """Index everything queued so far; returns the number of pages reindexed"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+        reindexed = 0
+        batch_size = self.batch_size
+        for model, page_ids in pending.items():
+            page_ids = sorted(page_ids)
+            for start in range(0, len(page_ids), batch_size):
+                reindexed += index_pages(model, page_ids[start:start + batch_size])
+        return reindexed
+
+    def flush_from_timer(self):
+        # Runs on the timer thread, which has its own db connection to tidy up
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flushing the search index queue failed")
+        finally:
+            connection.close()
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(page_ids) for page_ids in self.pending.values())
+
+
+index_queue = IndexQueue()
+
+
+def reindex(parallel=1, batch_size=200):
+    """
+    Cold rebuild of every deferred model: all pages are reindexed (no hash check) in
+    batches spread over parallel threads, each with its own db connection.
+    Returns the number of pages indexed.
+    """
+    jobs = []
+    for model in deferred_models():
+        page_ids = list(model.objects.order_by('pk').values_list('pk', flat=True))
+        jobs += [(model, page_ids[start:start + batch_size]) for start in range(0, len(page_ids), batch_size)]
+
+    def run(job):
+        model, page_ids = job
+        try:
+            return index_pages(model, page_ids, force=True)
+        finally:
+            if parallel > 1:
+                connection.close()
+
+    if parallel > 1:
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='reindex') as executor:
+            indexed = sum(executor.map(run, jobs))
+    else:
+        indexed = sum(map(run, jobs))
+
+    SearchDocument.objects.exclude(page__live=True).delete()
+    return indexed
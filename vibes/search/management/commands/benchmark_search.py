@@ -0,0 +1,104 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from wagtail.models import Page
+
+from blogs.models import BlogIndexPage, BlogPage
+from search.documents import postgres_search_available
+from search.engine import search_pages
+from search.indexing import reindex
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the search view's wagtail database backend against the tsvector engine on a "
+        "synthetic corpus. Everything is created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000, help="Synthetic posts to create")
+        parser.add_argument('--words', type=int, default=300, help="Words per post body")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not postgres_search_available():
+            raise CommandError("The tsvector engine needs PostgreSQL")
+
+        self.random = random.Random(options['seed'])
+        self.vocabulary = ['%s%s' % (self.word(), self.word()) for n in range(3000)]
+
+        try:
+            with transaction.atomic():
+                self.build_corpus(options['posts'], options['words'])
+                self.run(options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def word(self):
+        return ''.join(self.random.choice('bcdfghjklmnprstvz') + self.random.choice('aeiou') for n in range(2))
+
+    def sentence(self, words):
+        # Zipf-ish: a few words are everywhere, most are rare
+        return ' '.join(
+            self.vocabulary[min(int(self.random.paretovariate(1.2)) - 1, len(self.vocabulary) - 1)]
+            for n in range(words)
+        )
+
+    def build_corpus(self, posts, words):
+        started = time.monotonic()
+        root = Page.objects.get(depth=1)
+        index = root.add_child(instance=BlogIndexPage(title="Search benchmark", slug="search-benchmark-corpus"))
+        for n in range(posts):
+            index.add_child(instance=BlogPage(
+                title=self.sentence(6).title(),
+                slug='benchmark-%s' % n,
+                date=datetime.date.today(),
+                body=[('paragraph', '<p>%s</p>' % self.sentence(words))],
+            ))
+        reindex()
+        self.stdout.write("Built %s posts in %.1fs" % (posts, time.monotonic() - started))
+
+    def queries(self):
+        common, rare = self.vocabulary[0], self.vocabulary[-1]
+        return [
+            common,
+            rare,
+            '%s %s' % (self.vocabulary[1], self.vocabulary[5]),
+            '"%s %s"' % (self.vocabulary[2], self.vocabulary[3]),
+            '%s -%s' % (self.vocabulary[4], common),
+        ]
+
+    def time(self, function, repeat):
+        timings = []
+        for n in range(repeat):
+            started = time.monotonic()
+            function()
+            timings.append((time.monotonic() - started) * 1000)
+        return statistics.median(timings)
+
+    def run(self, repeat):
+        self.stdout.write("%-30s %14s %14s" % ("query", "wagtail (ms)", "tsvector (ms)"))
+        for query in self.queries():
+            def wagtail_backend():
+                # What the search view did: search, then a counting Paginator
+                results = Paginator(Page.objects.live().search(query), 10).page(1)
+                list(results)
+
+            def tsvector_engine():
+                list(search_pages(query, 1))
+
+            self.stdout.write("%-30s %14.1f %14.1f" % (
+                query[:30], self.time(wagtail_backend, repeat), self.time(tsvector_engine, repeat),
+            ))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.documents import postgres_search_available
+from search.indexing import reindex
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search index entries and tsvector documents of every BlogPage / AuthorPage "
+        "from scratch, in batches spread over --parallel threads"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parallel', type=int, default=1, help="Worker threads, each with its own db connection")
+        parser.add_argument('--batch-size', type=int, default=200, help="Pages per batch")
+
+    def handle(self, *args, **options):
+        if not postgres_search_available():
+            self.stderr.write("Not on PostgreSQL, the documents are stored without search vectors")
+
+        started = time.monotonic()
+        count = reindex(parallel=options['parallel'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            "Reindexed %s pages in %.1fs" % (count, time.monotonic() - started)
+        ))
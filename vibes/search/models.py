@@ -0,0 +1,28 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of a live page, flattened at publish time, with a stored
+    tsvector (GIN indexed, see migration 0001) for the PostgreSQL search engine.
+    title is weighted A, keywords (tags, categories, author details) B and body C.
+    Kept up to date by search.indexing; rebuild with reindex_blogs.
+    """
+    page = models.OneToOneField(
+        'wagtailcore.Page',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    title = models.TextField()
+    keywords = models.TextField(blank=True)
+    # Plain text of the StreamField, also what search headlines are cut from
+    body = models.TextField(blank=True)
+    search_vector = SearchVectorField(null=True)
+    # md5 of title/keywords/body; the indexing queue skips pages whose text hasn't changed
+    text_hash = models.CharField(max_length=32, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
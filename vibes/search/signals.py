@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from wagtail.search import index
+from wagtail.signals import page_published, page_unpublished
+from taggit.models import Tag
+
+from blogs.models import AuthorPage, BlogCategory, BlogPage
+from blogs.utils.cache import bump_namespace
+from search import autocomplete
+from search.cache import SEARCH_NAMESPACE
+from search.documents import remove_search_document
+from search.indexing import index_queue
+
+
+@receiver(post_save, sender=BlogPage)
+@receiver(post_save, sender=AuthorPage)
+def queue_saved_page(sender, instance, **kwargs):
+    # Publishing saves the page too, so this covers publishes. Fixtures are queued as well.
+    index_queue.add(sender, instance.pk)
+
+
+@receiver(post_delete, sender=BlogPage)
+@receiver(post_delete, sender=AuthorPage)
+def unindex_deleted_page(sender, instance, **kwargs):
+    # Dropping an entry is cheap, no need to queue it
+    index_queue.discard(sender, instance.pk)
+    index.remove_object(instance)
+
+
+@receiver(page_unpublished)
+def unindex_unpublished_page(sender, instance, **kwargs):
+    remove_search_document(instance)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def purge_search_results(sender, instance, **kwargs):
+    bump_namespace(SEARCH_NAMESPACE)
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def update_suggestions(sender, instance, **kwargs):
+    autocomplete.page_changed(instance)
+
+
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+def rebuild_suggestions(sender, instance, **kwargs):
+    autocomplete.rebuild_everywhere()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def rebuild_tag_suggestions(sender, instance, created=False, **kwargs):
+    # New tags come in with the publish of the post they are on; renames and deletes don't
+    if not created:
+        autocomplete.rebuild_everywhere()
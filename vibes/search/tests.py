@@ -0,0 +1,201 @@
+import datetime
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils.text import slugify
+
+from wagtail.contrib.search_promotions.models import QueryDailyHits
+from wagtail.models import Page
+
+from blogs.models import BlogCategory, BlogIndexPage, BlogPage
+from blogs.utils.cache import namespace_version
+from search import autocomplete
+from search.cache import SEARCH_NAMESPACE, cached_search, normalize_query
+from search.hits import hit_recorder
+from search.documents import document_fields
+from search.engine import highlight, HIGHLIGHT_START, HIGHLIGHT_STOP, search_pages, use_postgres_search
+from search.indexing import index_pages, index_queue
+from search.models import SearchDocument
+
+
+@override_settings(BLOG_SEARCH_INDEX_DELAY=0)
+class AutocompleteChangeLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete._state = (None, 0, None)
+        self.addCleanup(setattr, autocomplete, '_state', (None, 0, None))
+        self.index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+
+    def publish(self, title, *tags):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.index.add_child(instance=BlogPage(
+                title=title, slug=slugify(title), date=datetime.date.today(), body=[('paragraph', '<p>Hi</p>')],
+            ))
+            post.tags.add(*tags)
+            post.save_revision().publish()
+        return post
+
+    def unpublish(self, post):
+        with self.captureOnCommitCallbacks(execute=True):
+            post.unpublish()
+
+    def labels(self, prefix, index=None):
+        return [entry['label'] for entry in (index or autocomplete.get_index()).lookup(prefix)]
+
+    def test_other_processes_apply_the_logged_change(self):
+        autocomplete.get_index()
+        # What another process built before the publish
+        other = autocomplete.build_index()
+        version = namespace_version(autocomplete.AUTOCOMPLETE_NAMESPACE)
+
+        self.publish("Alpine lakes", "alps")
+        self.assertEqual(self.labels("alp"), ["Alpine lakes", "alps"])
+
+        autocomplete._state = (version, 0, other)
+        with self.assertNumQueries(0):
+            self.assertIs(autocomplete.get_index(), other)
+        self.assertEqual(self.labels("alp", other), ["Alpine lakes", "alps"])
+
+    def test_tags_go_with_their_last_post(self):
+        first = self.publish("First", "alps")
+        second = self.publish("Second", "alps", "lakes")
+
+        self.unpublish(first)
+        self.assertEqual(self.labels("alps"), ["alps"])
+
+        second.tags.remove("lakes")
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save_revision().publish()
+        self.assertEqual(self.labels("lakes"), [])
+
+        self.unpublish(second)
+        self.assertEqual(self.labels("alps"), [])
+
+    def test_missing_changes_rebuild_in_the_background(self):
+        old = autocomplete.get_index()
+        version = namespace_version(autocomplete.AUTOCOMPLETE_NAMESPACE)
+        self.publish("Alpine lakes")
+        cache.delete(autocomplete.CHANGE_KEY % (version + 1))
+        autocomplete._state = (version, 0, old)
+
+        with mock.patch('search.autocomplete.rebuild') as rebuild:
+            self.assertIs(autocomplete.get_index(), old)
+            self.addCleanup(setattr, autocomplete, '_rebuilding', False)
+        rebuild.assert_called_once_with(version + 1)
+
+
+@override_settings(BLOG_SEARCH_INDEX_DELAY=0)
+class IndexQueueTests(TestCase):
+    def setUp(self):
+        self.index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+
+    def test_no_delay_indexes_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.index.add_child(instance=BlogPage(
+                title="Alpine lakes", slug="alpine-lakes", date=datetime.date.today(),
+                body=[('paragraph', '<p>Cold water</p>')],
+            ))
+            post.save_revision().publish()
+
+        self.assertEqual(len(index_queue), 0)
+        self.assertIsNone(index_queue.timer)
+        document = SearchDocument.objects.get(page=post)
+        self.assertEqual(document.title, "Alpine lakes")
+        self.assertIn("Cold water", document.body)
+
+
+@override_settings(BLOG_SEARCH_INDEX_DELAY=0, BLOG_SEARCH_HITS_FLUSH_INTERVAL=0)
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("The  Dolomites"), "dolomites")
+        self.assertEqual(normalize_query('"The Alps" or the lakes'), '"the alps" or lakes')
+        self.assertEqual(normalize_query("The"), "the")
+
+    def test_results_are_cached_until_a_publish(self):
+        self.assertEqual(len(cached_search("alps", 1)), 0)
+        with self.assertNumQueries(0):
+            cached_search("alps", "1")
+
+        version = namespace_version(SEARCH_NAMESPACE)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.index.add_child(instance=BlogPage(
+                title="Alps", slug="alps", date=datetime.date.today(), body=[('paragraph', '<p>Hi</p>')],
+            ))
+            post.save_revision().publish()
+        self.assertGreater(namespace_version(SEARCH_NAMESPACE), version)
+        self.assertEqual([page.pk for page in cached_search("alps", 1)], [post.pk])
+
+    def test_no_flush_interval_writes_hits_in_the_request(self):
+        self.client.get('/search/', {'query': "The Alps"})
+        self.client.get('/search/', {'query': "alps"})
+
+        self.assertIsNone(hit_recorder.timer)
+        daily_hits = QueryDailyHits.objects.get()
+        self.assertEqual(daily_hits.query.query_string, "alps")
+        self.assertEqual(daily_hits.hits, 2)
+
+
+class SearchDocumentTests(TestCase):
+    def setUp(self):
+        self.index = Page.objects.get(depth=1).add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+
+    def add_post(self, title, text):
+        post = self.index.add_child(instance=BlogPage(
+            title=title, slug=slugify(title), date=datetime.date.today(), body=[('paragraph', '<p>%s</p>' % text)],
+        ))
+        post.save_revision().publish()
+        return post
+
+    def test_document_fields(self):
+        post = self.add_post("Alpine lakes", "Cold <b>water</b>")
+        post.tags.add("alps")
+        post.categories.add(BlogCategory.objects.create(name="Travel"))
+        post.save()
+
+        self.assertEqual(document_fields(post), ("Alpine lakes", "alps Travel", "Cold water"))
+
+    def test_unchanged_pages_are_skipped(self):
+        post = self.add_post("Alpine lakes", "Cold water")
+        self.assertEqual(index_pages(BlogPage, [post.pk]), 1)
+        self.assertEqual(index_pages(BlogPage, [post.pk]), 0)
+        self.assertEqual(index_pages(BlogPage, [post.pk], force=True), 1)
+
+        post.body = [('paragraph', '<p>Warm water</p>')]
+        post.save_revision().publish()
+        self.assertEqual(index_pages(BlogPage, [post.pk]), 1)
+        self.assertEqual(SearchDocument.objects.get(page=post).body, "Warm water")
+
+    def test_unpublished_pages_lose_their_document(self):
+        post = self.add_post("Alpine lakes", "Cold water")
+        index_pages(BlogPage, [post.pk])
+
+        BlogPage.objects.filter(pk=post.pk).update(live=False)
+        index_pages(BlogPage, [post.pk])
+        self.assertFalse(SearchDocument.objects.filter(page=post).exists())
+
+    def test_headlines_are_escaped_then_marked(self):
+        self.assertEqual(
+            highlight('<b>%scold%s</b> water' % (HIGHLIGHT_START, HIGHLIGHT_STOP)),
+            '&lt;b&gt;<mark>cold</mark>&lt;/b&gt; water',
+        )
+
+    @override_settings(BLOG_SEARCH_ENGINE='postgres')
+    def test_postgres_engine_needs_postgres(self):
+        self.assertEqual(use_postgres_search(), connection.vendor == 'postgresql')
+
+    @skipUnless(connection.vendor == 'postgresql', "Ranks with PostgreSQL full text search")
+    def test_title_matches_rank_first(self):
+        body_match = self.add_post("Lakes", "The alps are cold")
+        title_match = self.add_post("Alps", "Cold water")
+        index_pages(BlogPage, [body_match.pk, title_match.pk])
+
+        results = search_pages("alps", per_page=1)
+        self.assertEqual([page.pk for page in results], [title_match.pk])
+        self.assertTrue(results.has_next())
+        self.assertIn("<mark>", search_pages("alps -water")[0].search_headline)
@@ -1,14 +1,9 @@
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import JsonResponse
 from django.template.response import TemplateResponse
 
-from wagtail.models import Page
-
-# To enable logging of search queries for use with the "Promoted search results" module
-# <https://docs.wagtail.org/en/stable/reference/contrib/searchpromotions.html>
-# uncomment the following line and the lines indicated in the search function
-# (after adding wagtail.contrib.search_promotions to INSTALLED_APPS):
-
-# from wagtail.contrib.search_promotions.models import Query
+from search.autocomplete import autocomplete as suggest
+from search.cache import cached_search, normalize_query
+from search.hits import hit_recorder
 
 
 def search(request):
@@ -16,25 +11,16 @@ def search(request):
     page = request.GET.get("page", 1)
 
     # Search
-    if search_query:
-        search_results = Page.objects.live().search(search_query)
-
-        # To log this query for use with the "Promoted search results" module:
+    if search_query and search_query.strip():
+        # Queries that only differ in case, spacing or stop words share a cache entry
+        query_string = normalize_query(search_query)
+        search_results = cached_search(query_string, page)
 
-        # query = Query.get(search_query)
-        # query.add_hit()
+        # Logged for the "Promoted search results" module, written in batches
+        hit_recorder.add(query_string)
 
     else:
-        search_results = Page.objects.none()
-
-    # Pagination
-    paginator = Paginator(search_results, 10)
-    try:
-        search_results = paginator.page(page)
-    except PageNotAnInteger:
-        search_results = paginator.page(1)
-    except EmptyPage:
-        search_results = paginator.page(paginator.num_pages)
+        search_results = None
 
     return TemplateResponse(
         request,
@@ -44,3 +30,12 @@ def search(request):
             "search_results": search_results,
         },
     )
+
+
+def autocomplete(request):
+    """Typeahead suggestions (posts, categories, tags, authors) for ?q=, as JSON"""
+    prefix = request.GET.get("q", "")[:100]
+    return JsonResponse({
+        "query": prefix,
+        "results": suggest(prefix),
+    })
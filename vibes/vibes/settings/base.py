@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     "wagtail.sites",
 
     "wagtail.contrib.routable_page",
+    "wagtail.contrib.search_promotions",
     "wagtail.users",
     "wagtail.snippets",
     "wagtail.documents",
@@ -53,7 +54,10 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "pwa",
     "blogs",
-    "relationship"
+    "relationship",
+    "django.contrib.sites",
+    "django_comments",
+    "custom_comments",
 
 ]
 
@@ -102,6 +106,32 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Shared between workers through Redis when REDIS_URL is set (see docker-compose),
+# otherwise each process keeps its own in memory
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+            "KEY_PREFIX": "vibes",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -141,10 +171,19 @@ STATICFILES_FINDERS = [
     "django.contrib.staticfiles.finders.AppDirectoriesFinder",
 ]
 
+# Generated by the build_assets command, which collectstatic runs first; not checked in.
+# Created here so the staticfiles checks don't warn about it before the first build.
+ASSETS_BUILD_DIR = os.path.join(BASE_DIR, "build", "static")
+os.makedirs(ASSETS_BUILD_DIR, exist_ok=True)
+
 STATICFILES_DIRS = [
     os.path.join(PROJECT_DIR, "static"),
+    ASSETS_BUILD_DIR,
 ]
 
+# The landing images are built in these formats (where Pillow can write them) besides jpeg
+LANDING_IMAGE_FORMATS = ("avif", "webp")
+
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 STATIC_URL = "/static/"
 
@@ -171,6 +210,38 @@ STORAGES = {
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10_000
 
 
+# Comments
+# custom_comments provides the form (and the model lookups) for django_comments
+COMMENTS_APP = "custom_comments"
+
+# New comments are saved hidden and published once a background worker finds MX
+# records for the commenter's domain. COMMENT_MX_WORKERS = 0 checks inline;
+# COMMENT_MX_RESOLVER is a callable(domain, timeout) or a class to instantiate, e.g.
+# custom_comments.verification.StubMXResolver in tests. Comments still pending after
+# COMMENT_MX_RETRY_AFTER seconds are checked again by retry_comment_verifications.
+COMMENT_MX_RESOLVER = "custom_comments.verification.dns_mx_resolver"
+COMMENT_MX_WORKERS = 4
+COMMENT_MX_TIMEOUT = 5
+COMMENT_MX_RETRY_AFTER = 10 * 60
+# MX answers are cached for their DNS TTL (clamped to MIN/MAX), NXDOMAIN / no-answer
+# for NEGATIVE_TTL seconds, per process and, when SHARED, in the default cache
+COMMENT_DNS_CACHE_SIZE = 1000
+COMMENT_DNS_CACHE_SHARED = True
+COMMENT_DNS_NEGATIVE_TTL = 5 * 60
+COMMENT_DNS_MIN_TTL = 60
+COMMENT_DNS_MAX_TTL = 60 * 60 * 24
+# Token buckets for post_comment as {scope: (requests, per seconds)}: every POST is
+# charged by client IP and commenter email, valid comments also by page.
+# Over the limit gets a 429 with Retry-After.
+COMMENT_RATE_LIMITS = {
+    "ip": (5, 60),
+    "email": (3, 60),
+    "page": (30, 60),
+}
+# Reverse proxies in front of the app that append to X-Forwarded-For (e.g. 1 behind traefik)
+COMMENT_RATE_LIMIT_PROXIES = 0
+
+
 # Wagtail settings
 
 WAGTAIL_SITE_NAME = "vibes"
@@ -183,6 +254,29 @@ WAGTAILSEARCH_BACKENDS = {
     }
 }
 
+# The search view's engine: "wagtail" (the backend above) or "postgres", ranked top-N
+# results from the GIN-indexed tsvectors in search.SearchDocument. "postgres" falls back
+# to wagtail on other databases. Fill the table with the reindex_blogs command.
+BLOG_SEARCH_ENGINE = os.environ.get("BLOG_SEARCH_ENGINE", "wagtail")
+BLOG_SEARCH_CONFIG = "english"
+# Deepest result the postgres engine pages to
+BLOG_SEARCH_MAX_RESULTS = 200
+# BlogPage / AuthorPage saves are indexed (wagtail index and SearchDocument) by a queue,
+# this many seconds after the first queued save and in batches of BATCH_SIZE pages.
+# DELAY = 0 indexes as soon as the transaction commits. Saves still queued when the
+# process exits (e.g. right after loaddata) are not indexed until the next reindex_blogs.
+BLOG_SEARCH_INDEX_DELAY = 2.0
+BLOG_SEARCH_INDEX_BATCH_SIZE = 100
+# Result pages are cached per normalized query for this long (and dropped on publish)
+BLOG_SEARCH_CACHE_TIMEOUT = 60 * 5
+# Query hits for search promotions are counted in memory and written every so many seconds,
+# 0 writes them during the search request
+BLOG_SEARCH_HITS_FLUSH_INTERVAL = 30
+# Suggestions per autocomplete request, and how often (seconds) a process checks
+# whether another one has published something, which it applies from a shared change log
+BLOG_AUTOCOMPLETE_LIMIT = 8
+BLOG_AUTOCOMPLETE_RECHECK = 5
+
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
 WAGTAILADMIN_BASE_URL = "http://example.com"
@@ -194,4 +288,37 @@ WAGTAILADMIN_BASE_URL = "http://example.com"
 WAGTAILDOCS_EXTENSIONS = ['csv', 'docx', 'key', 'odt', 'pdf', 'pptx', 'rtf', 'txt', 'xlsx', 'zip']
 
 
+# Blog listings
+# Listing totals are cached until the next publish/unpublish (or this timeout).
+BLOG_COUNT_CACHE_TIMEOUT = 60 * 60
+# Category slug lookups and per-category post lists, also purged on publish
+BLOG_CATEGORY_CACHE_TIMEOUT = 60 * 60
+# The tag index (tag directory and per-tag post lists), also purged on publish and tag edits
+BLOG_TAG_CACHE_TIMEOUT = 60 * 60
+# How often (seconds) a process re-checks its in-memory category list against the shared cache
+BLOG_CATEGORY_SNAPSHOT_RECHECK = 5
+# Rendered pages served to anonymous visitors, purged on publish/unpublish
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 10
+# Author pages: how many recent posts they list (materialized on publish) and how long
+# those lists and the rendered bios are cached
+BLOG_AUTHOR_RECENT_POSTS = 7
+BLOG_AUTHOR_CACHE_TIMEOUT = 60 * 60
+# Authors per page of the author directory endpoint
+BLOG_AUTHORS_PER_PAGE = 20
+# Comments shown with a post, the rest are fetched page by page from the comment_list view
+BLOG_COMMENTS_PER_PAGE = 20
+# Stored with each post on publish: an excerpt of the first paragraph (this many words)
+# and a reading time at this many words a minute. Backfill with backfill_text_stats.
+BLOG_EXCERPT_WORDS = 40
+BLOG_WORDS_PER_MINUTE = 200
+# Images are resized ahead of time, on upload and publish, in a pool of this many threads
+# (0 resizes inline when the transaction commits): each of these widths up to the image's own,
+# in its own format and in each of these formats that Pillow can write (avif needs Pillow
+# 11.3+ or pillow-avif-plugin). Templates use them through {% responsive_image %};
+# fill in older images with pregenerate_renditions.
+BLOG_RENDITION_WIDTHS = (320, 640, 960, 1280, 1920)
+BLOG_RENDITION_FORMATS = ("avif", "webp")
+BLOG_RENDITION_WORKERS = 2
+
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
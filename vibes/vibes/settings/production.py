@@ -2,6 +2,10 @@ from .base import *
 
 DEBUG = False
 
+# Static files are served by whitenoise, which gives the hashed names collectstatic writes
+# (ManifestStaticFilesStorage) far-future, immutable cache headers
+MIDDLEWARE = ["whitenoise.middleware.WhiteNoiseMiddleware"] + MIDDLEWARE
+
 try:
     from .local import *
 except ImportError:
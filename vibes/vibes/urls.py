@@ -6,16 +6,20 @@ from django.views.static import serve
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
-from home.views import home_css_view
 
+from blogs import views as blog_views
 from search import views as search_views
+from custom_comments import views as comment_views
 
 urlpatterns = [
     path("django-admin/", admin.site.urls),
     path("admin/", include(wagtailadmin_urls)),
     path("documents/", include(wagtaildocs_urls)),
     path("search/", search_views.search, name="search"),
-    path('welcome_page_img.css', home_css_view, name='home_css_view'),
+    path("search/autocomplete/", search_views.autocomplete, name="search_autocomplete"),
+    path("authors/directory/", blog_views.author_directory, name="author_directory"),
+    path("comments/<int:page_id>/", comment_views.comment_list, name="comment_list"),
+    path("comments/<int:page_id>/post/", comment_views.post_comment, name="post_comment"),
 ]
 
 